@@ -14,8 +14,12 @@ def correct_stb_fields(db_path='malody_rankings.db'):
     """更正STB谱面表中的字段错误"""
     logger = logging.getLogger(__name__)
     
+    conn = None
     try:
         conn = sqlite3.connect(db_path)
+        # WAL + NORMAL 同步减少批量更新时的fsync次数
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
         cursor = conn.cursor()
         
         # 检查表是否存在
@@ -24,8 +28,9 @@ def correct_stb_fields(db_path='malody_rankings.db'):
             logger.error("charts表不存在")
             return False
         
-        # 获取需要更正的记录数量
-        cursor.execute("SELECT COUNT(*) FROM charts WHERE heat > 0 OR donate_count > 0")
+        # 获取需要更正的记录数量（两字段相等时交换不会改变数据，直接跳过，避免无意义的页写入；
+        # 两字段都没有正值的记录不做交换）
+        cursor.execute("SELECT COUNT(*) FROM charts WHERE heat != donate_count AND (heat > 0 OR donate_count > 0)")
         total_records = cursor.fetchone()[0]
         logger.info("发现 %d 条需要更正的记录", total_records)
         
@@ -34,15 +39,20 @@ def correct_stb_fields(db_path='malody_rankings.db'):
             return True
         
         # 交换heat和donate_count字段的值
-        cursor.execute('''
-        UPDATE charts 
-        SET heat = donate_count, 
-            donate_count = heat 
-        WHERE heat > 0 OR donate_count > 0
-        ''')
-        
-        affected_rows = cursor.rowcount
-        conn.commit()
+        # SQLite的单条UPDATE中右侧表达式都读取更新前的旧值，因此可以直接原子地完成交换
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute('''
+            UPDATE charts 
+            SET heat = donate_count, 
+                donate_count = heat 
+            WHERE heat != donate_count AND (heat > 0 OR donate_count > 0)
+            ''')
+            affected_rows = cursor.rowcount
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
         
         logger.info("成功更正 %d 条记录的字段", affected_rows)
         
@@ -54,12 +64,14 @@ def correct_stb_fields(db_path='malody_rankings.db'):
         for cid, heat, donate in sample_records:
             logger.info("CID: %s, 热度: %s, 打赏: %s", cid, heat, donate)
         
-        conn.close()
         return True
         
     except Exception as e:
         logger.error("更正字段时出错: %s", e)
         return False
+    finally:
+        if conn:
+            conn.close()
 
 def main():
     """主函数"""
@@ -1,6 +1,7 @@
 
 import sys
 import os
+import importlib.util
 
 def main():
     # 添加当前目录到Python路径
@@ -8,11 +9,13 @@ def main():
     if current_dir not in sys.path:
         sys.path.insert(0, current_dir)
     
-    # 检查是否安装了必要的GUI库
-    try:
-        import tkinter
-        import matplotlib
-    except ImportError:
+    # 检查是否安装了必要的GUI库（只查找模块位置，不实际执行导入）
+    # tkinter包本身是纯Python的，缺少Tk时只是_tkinter扩展不存在，因此探测_tkinter
+    has_gui_deps = all(
+        importlib.util.find_spec(name) is not None
+        for name in ("_tkinter", "matplotlib")
+    )
+    if not has_gui_deps:
         # 没有GUI支持，直接启动命令行版本
         from malody_stats import MalodyViz
         viz = MalodyViz()
@@ -2,7 +2,7 @@ import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 from openpyxl import load_workbook
-from datetime import datetime
+from datetime import datetime, timedelta
 import time
 import os
 import gc
@@ -18,16 +18,10 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import queue
 import re
 import argparse
+from sqlite_datetime import register_datetime_converters
 
-# 修复Python 3.12中SQLite datetime适配器的弃用警告
-def adapt_datetime(dt):
-    return dt.isoformat()
-
-def convert_datetime(s):
-    return datetime.fromisoformat(s.decode())
-
-sqlite3.register_adapter(datetime, adapt_datetime)
-sqlite3.register_converter("timestamp", convert_datetime)
+# 注册SQLite的datetime适配器/转换器
+register_datetime_converters()
 
 try:
     from tqdm import tqdm
@@ -65,6 +59,10 @@ PLAYER_PROFILE_URL = "https://m.mugzone.net/accounts/user/{player_id}"
 MODES = list(range(10))
 
 DB_FILE = "malody_rankings.db"
+# 玩家主页链接中的UID，解析排行榜每一行时复用
+_USER_LINK_RE = re.compile(r'/accounts/user/(\d+)')
+# 定期重新收集查询规划器统计信息的间隔
+ANALYZE_INTERVAL = timedelta(days=7)
 
 GIT_REPO_PATH = os.path.dirname(os.path.abspath(__file__))
 GIT_COMMIT_MESSAGE = datetime.now().strftime("%Y-%m-%d %H:%M updated")
@@ -111,6 +109,11 @@ class DatabaseManager:
     def get_connection(self, thread_id=None):
         if thread_id is None:
             thread_id = threading.get_ident()
+        
+        # 快速路径：本线程的连接已建立时直接复用，无需加锁
+        conn = self.connections.get(thread_id)
+        if conn is not None:
+            return conn
             
         with self._lock:
             if thread_id not in self.connections:
@@ -121,17 +124,29 @@ class DatabaseManager:
                     check_same_thread=False
                 )
                 self.connections[thread_id].execute("PRAGMA journal_mode=WAL")
+                self.connections[thread_id].execute("PRAGMA synchronous = NORMAL")
                 self.connections[thread_id].execute("PRAGMA busy_timeout = 30000")
+                self.connections[thread_id].execute("PRAGMA temp_store = MEMORY")
+                self.connections[thread_id].execute("PRAGMA cache_size = -65536")  # 约64MB页缓存
             return self.connections[thread_id]
     
+    @staticmethod
+    def _optimize_and_close(conn):
+        # 关闭前让SQLite按本连接的查询情况更新规划器统计信息（SQLite官方建议的做法）
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            logger.warning("PRAGMA optimize 执行失败: %s", e)
+        conn.close()
+    
     def close_connection(self, thread_id=None):
         with self._lock:
             if thread_id is None:
                 for conn in self.connections.values():
-                    conn.close()
+                    self._optimize_and_close(conn)
                 self.connections = {}
             elif thread_id in self.connections:
-                self.connections[thread_id].close()
+                self._optimize_and_close(self.connections[thread_id])
                 del self.connections[thread_id]
     
     def execute_query(self, query, params=None, thread_id=None):
@@ -221,6 +236,59 @@ def migrate_database():
         db_manager.get_connection().rollback()
         return False
 
+def init_player_alias_fts(cursor):
+    """创建玩家曾用名的FTS5三元组全文索引，支持子串搜索玩家名而无需全表LIKE扫描
+    
+    索引以player_aliases为外部内容表，通过触发器与其保持同步；
+    SQLite未编译FTS5或版本过低不支持trigram时跳过，搜索会回退到LIKE
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'player_alias_fts'")
+    if cursor.fetchone():
+        return
+    
+    try:
+        cursor.execute('''
+        CREATE VIRTUAL TABLE player_alias_fts USING fts5(
+            alias, content='player_aliases', content_rowid='alias_id', tokenize='trigram'
+        )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning("当前SQLite不支持FTS5 trigram，跳过玩家名全文索引: %s", e)
+        return
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS player_aliases_fts_ai AFTER INSERT ON player_aliases BEGIN
+        INSERT INTO player_alias_fts(rowid, alias) VALUES (new.alias_id, new.alias);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS player_aliases_fts_ad AFTER DELETE ON player_aliases BEGIN
+        INSERT INTO player_alias_fts(player_alias_fts, rowid, alias) VALUES ('delete', old.alias_id, old.alias);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS player_aliases_fts_au AFTER UPDATE OF alias ON player_aliases BEGIN
+        INSERT INTO player_alias_fts(player_alias_fts, rowid, alias) VALUES ('delete', old.alias_id, old.alias);
+        INSERT INTO player_alias_fts(rowid, alias) VALUES (new.alias_id, new.alias);
+    END
+    ''')
+    
+    # 为已有的曾用名建立索引
+    cursor.execute("INSERT INTO player_alias_fts(player_alias_fts) VALUES ('rebuild')")
+    logger.info("已创建玩家名全文索引")
+
+def estimate_row_count(cursor, table):
+    """估算表行数：优先读取ANALYZE写入sqlite_stat1的统计值，没有统计信息时退回MAX(rowid)，均无需全表扫描"""
+    try:
+        cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,))
+        row = cursor.fetchone()
+        if row and row[0]:
+            return int(row[0].split()[0])
+    except sqlite3.OperationalError:
+        pass  # 尚未执行过ANALYZE，sqlite_stat1不存在
+    cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+    return cursor.fetchone()[0] or 0
+
 def init_database():
     """初始化数据库，创建表结构"""
     db_manager = DatabaseManager()
@@ -275,6 +343,14 @@ def init_database():
         )
         ''')
         
+        # 定期维护任务（如ANALYZE）的上次执行时间，爬虫重启后据此继续原有周期
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_state (
+            task TEXT PRIMARY KEY,
+            last_run TIMESTAMP NOT NULL
+        )
+        ''')
+        
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS player_config (
             config_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -301,6 +377,13 @@ def init_database():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_player_identity_uid ON player_identity(uid)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_player_aliases_uid ON player_aliases(uid)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_player_rankings_uid ON player_rankings(uid)')
+        # 按模式+抓取时间定位快照并按排名输出；按玩家+模式查询历史/最新数据；按曾用名查玩家
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_player_rankings_mode_crawl_rank ON player_rankings(mode, crawl_time, rank)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_player_rankings_player_mode_crawl ON player_rankings(player_id, mode, crawl_time DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_player_aliases_alias ON player_aliases(alias)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_player_aliases_player_last ON player_aliases(player_id, last_seen DESC)')
+        
+        init_player_alias_fts(cursor)
         
         for mode in MODES:
             cursor.execute(
@@ -309,6 +392,8 @@ def init_database():
             )
         
         db_manager.get_connection().commit()
+        # 让查询规划器获取新索引的统计信息（只分析需要的表，开销很小）
+        cursor.execute('PRAGMA optimize')
         logger.info("数据库初始化完成")
         
         migrate_database()
@@ -499,7 +584,7 @@ def parse_player_list(html):
         player_id = None
         if name_tag and name_tag.has_attr('href'):
             href = name_tag['href']
-            match = re.search(r'/accounts/user/(\d+)', href)
+            match = _USER_LINK_RE.search(href)
             if match:
                 player_id = match.group(1)
         
@@ -555,7 +640,7 @@ def parse_player_list(html):
         player_id = None
         if name_tag and name_tag.has_attr('href'):
             href = name_tag['href']
-            match = re.search(r'/accounts/user/(\d+)', href)
+            match = _USER_LINK_RE.search(href)
             if match:
                 player_id = match.group(1)
         
@@ -1586,6 +1671,46 @@ def run_crawler_cycle(crawl_players=False, save_excel=False):
     logger.info("爬取周期完成, 用时: %.2f秒", duration)
     logger.info("=" * 50)
 
+def _save_last_analyze_time(conn, run_time):
+    conn.execute(
+        "INSERT INTO maintenance_state (task, last_run) VALUES ('analyze', ?) "
+        "ON CONFLICT(task) DO UPDATE SET last_run = excluded.last_run",
+        (run_time,)
+    )
+
+def load_last_analyze_time():
+    """读取持久化的上次ANALYZE时间
+    
+    没有记录时把当前时间写入作为起点，首次ANALYZE在一个周期之后执行，
+    避免每次启动爬虫都做一次全表统计
+    """
+    conn = DatabaseManager().get_connection()
+    row = conn.execute("SELECT last_run FROM maintenance_state WHERE task = 'analyze'").fetchone()
+    if row:
+        return row[0]
+    
+    now = datetime.now()
+    _save_last_analyze_time(conn, now)
+    conn.commit()
+    return now
+
+def run_periodic_analyze(last_analyze_time):
+    """距上次ANALYZE超过ANALYZE_INTERVAL时重新收集全部统计信息，返回最近一次执行的时间"""
+    now = datetime.now()
+    if now - last_analyze_time < ANALYZE_INTERVAL:
+        return last_analyze_time
+    
+    conn = DatabaseManager().get_connection()
+    try:
+        conn.execute("ANALYZE")
+        _save_last_analyze_time(conn, now)
+        conn.commit()
+        logger.info("已更新数据库统计信息 (ANALYZE)")
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.warning("ANALYZE 执行失败: %s", e)
+    return now
+
 def parse_arguments():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='Malody排行榜爬虫')
@@ -1634,15 +1759,16 @@ def main():
     db_manager = DatabaseManager()
     cursor = db_manager.get_connection().cursor()
     
-    cursor.execute("SELECT COUNT(*) FROM player_rankings")
-    count = cursor.fetchone()[0]
+    # 只需判断是否为空库，EXISTS读到第一行即返回，不必COUNT(*)扫描整张排名表
+    cursor.execute("SELECT EXISTS(SELECT 1 FROM player_rankings)")
+    has_data = cursor.fetchone()[0]
     
-    if count == 0:
+    if not has_data:
         logger.info("开始导入历史数据...")
         import_historical_data()
         logger.info("历史数据导入完成")
     else:
-        logger.info("数据库中已有 %d 条记录，跳过历史数据导入", count)
+        logger.info("数据库中已有约 %d 条记录，跳过历史数据导入", estimate_row_count(cursor, "player_rankings"))
     
     if args.import_only:
         DatabaseManager().close_connection()
@@ -1655,6 +1781,7 @@ def main():
         DatabaseManager().close_connection()
         return
     else:
+        last_analyze_time = load_last_analyze_time()
         try:
             while True:
                 with stop_lock:
@@ -1667,6 +1794,8 @@ def main():
                 except Exception as e:
                     logger.exception("主循环发生未处理异常")
                 
+                last_analyze_time = run_periodic_analyze(last_analyze_time)
+                
                 logger.info("等待30分钟后重启...")
                 
                 for i in range(30):
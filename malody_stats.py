@@ -7,17 +7,20 @@ import cmd
 import os
 import sys
 import textwrap
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, NamedTuple
 import matplotlib.dates as mdates
 from matplotlib.ticker import MaxNLocator, LogLocator, FuncFormatter
 import subprocess
 import atexit
 import signal
-from functools import wraps
+from functools import wraps, lru_cache
 import shutil
 import re
 import math
-from selector import global_selector, MCSelector
+import csv
+from collections import Counter
+from selector import global_selector, MCSelector, MODE_NAMES, build_in_condition
+from sqlite_datetime import register_datetime_converters
 
 # 修复matplotlib中文字体问题
 def setup_chinese_font():
@@ -99,15 +102,8 @@ def enable_powershell_colors():
 # 在程序启动时启用 PowerShell 颜色
 enable_powershell_colors()
 
-# 修复Python 3.12中SQLite datetime适配器的弃用警告
-def adapt_datetime(dt):
-    return dt.isoformat()
-
-def convert_datetime(s):
-    return datetime.fromisoformat(s.decode())
-
-sqlite3.register_adapter(datetime, adapt_datetime)
-sqlite3.register_converter("timestamp", convert_datetime)
+# 注册SQLite的datetime适配器/转换器
+register_datetime_converters()
 
 # 设置matplotlib使用Agg后端（无GUI）
 plt.switch_backend('Agg')
@@ -132,8 +128,9 @@ class Colors:
     UNDERLINE = '\033[4m'
     END = '\033[0m'
 
+@lru_cache(maxsize=None)
 def color_enabled():
-    """检查当前环境是否支持颜色输出"""
+    """检查当前环境是否支持颜色输出（结果在进程内缓存，避免每次着色都重复探测终端）"""
     if sys.platform == "win32":
         # 在 Windows 上检查是否在支持颜色的终端中运行
         try:
@@ -246,6 +243,180 @@ def get_subseparator(width=None):
         width = get_terminal_width()
     return colorize("-" * min(width, 100), Colors.CYAN)
 
+# (rank, crawl_time) 历史查询结果对应的numpy结构化类型
+HISTORY_DTYPE = np.dtype([('rank', np.int64), ('crawl_time', 'datetime64[us]')])
+
+def history_columns(history_rows):
+    """
+    把 (rank, crawl_time) 查询结果转成列式numpy数组 (排名, 时间)，供降采样和绘图直接使用。
+    history_rows 可以是行列表，也可以直接传入游标逐行读取，无需先fetchall出中间列表。
+    时间列一次性转换为matplotlib日期数值，降采样和绘图都复用它，不再重复转换datetime。
+    """
+    rows = np.fromiter(history_rows, dtype=HISTORY_DTYPE)
+    return rows['rank'], mdates.date2num(rows['crawl_time'])
+
+def m4_downsample_indices(x, y, width_px):
+    """
+    M4降采样：按图表像素宽度把x轴等分成若干桶，每个桶只保留
+    第一个点、最后一个点、最小值点和最大值点，绘制出的折线与原始数据在像素级上一致。
+    x 需为按升序排列的数值（如 mdates.date2num 的结果），返回按原顺序排列的保留点下标。
+    """
+    n = len(x)
+    if width_px <= 0 or n <= 4 * width_px:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    
+    edges = np.linspace(x[0], x[-1], width_px + 1)
+    buckets = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, width_px - 1)
+    
+    # x已排序，每个桶对应一段连续区间
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    
+    # 桶内按y排序后，每段的首尾即为该桶的最小值和最大值
+    order = np.lexsort((y, buckets))
+    keep = np.concatenate([starts, ends, order[starts], order[ends]])
+    return np.unique(keep)
+
+# 历史折线超过该点数时不再绘制逐点标记，标记的绘制开销随点数线性增长且密集时已无法分辨
+HISTORY_MARKER_LIMIT = 200
+
+# 导出CSV时每批从游标读取的行数
+EXPORT_FETCH_SIZE = 1000
+
+def format_crawl_time(value):
+    """将爬取时间（数据库原始文本或datetime）格式化为 YYYY-MM-DD HH:MM:SS"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def history_line_fmt(n_points):
+    """根据数据点数量选择历史折线的格式字符串"""
+    return 'o-' if n_points <= HISTORY_MARKER_LIMIT else '-'
+
+class TrendRow(NamedTuple):
+    """trend命令中的一行玩家变化数据，字段顺序与_TREND_SQL的输出列一一对应"""
+    player_id: int
+    name: str
+    status: str  # '=' 一直在榜, '-' 掉出榜, '+' 新上榜
+    start_rank: Optional[int]
+    end_rank: Optional[int]
+    rank_change: Optional[int]  # 负数表示进步
+    start_lv: Optional[int]
+    end_lv: Optional[int]
+    lv_change: Optional[int]
+    start_exp: Optional[int]
+    end_exp: Optional[int]
+    exp_change: Optional[int]
+    start_acc: Optional[float]
+    end_acc: Optional[float]
+    acc_change: Optional[float]
+    start_combo: Optional[int]
+    end_combo: Optional[int]
+    combo_change: Optional[int]
+    start_pc: Optional[int]
+    end_pc: Optional[int]
+    pc_change: Optional[int]
+
+# 在SQL中一次性对比起止两次快照：一直在榜(=)与掉出榜(-)的玩家来自起始快照的LEFT JOIN，
+# 新上榜(+)的玩家来自结束快照中起始快照不存在的部分（SQLite不支持FULL OUTER JOIN）；
+# 结果按结束排名排序，掉出榜的玩家排在最后
+_TREND_SQL = """
+WITH s AS (
+    SELECT player_id, name, rank, lv, exp, acc, combo, pc
+    FROM player_rankings WHERE mode = ? AND crawl_time = ?
+), e AS (
+    SELECT player_id, name, rank, lv, exp, acc, combo, pc
+    FROM player_rankings WHERE mode = ? AND crawl_time = ?
+)
+SELECT * FROM (
+SELECT s.player_id, COALESCE(e.name, s.name),
+       CASE WHEN e.player_id IS NULL THEN '-' ELSE '=' END,
+       s.rank AS start_rank, e.rank AS end_rank, e.rank - s.rank,
+       s.lv, e.lv, e.lv - s.lv,
+       s.exp, e.exp, e.exp - s.exp,
+       s.acc, e.acc, e.acc - s.acc,
+       s.combo, e.combo, e.combo - s.combo,
+       s.pc, e.pc, e.pc - s.pc
+FROM s LEFT JOIN e ON e.player_id = s.player_id
+UNION ALL
+SELECT e.player_id, e.name, '+',
+       NULL, e.rank, NULL,
+       NULL, e.lv, NULL,
+       NULL, e.exp, NULL,
+       NULL, e.acc, NULL,
+       NULL, e.combo, NULL,
+       NULL, e.pc, NULL
+FROM e LEFT JOIN s ON s.player_id = e.player_id
+WHERE s.player_id IS NULL
+)
+ORDER BY end_rank IS NULL, end_rank, start_rank
+"""
+
+class GenerationCache:
+    """按数据库版本失效的有界结果缓存
+    
+    数据库版本（见 MalodyViz._db_generation）变化即爬虫写入了新数据，此时整体清空；
+    条目数达到上限时淘汰最早写入的条目
+    """
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._generation = None
+        self._entries = {}
+    
+    def get_or_compute(self, generation, key, compute):
+        """命中时返回缓存值，否则调用compute()计算并缓存；compute抛出异常时不缓存"""
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+        elif key in self._entries:
+            return self._entries[key]
+        
+        value = compute()
+        if len(self._entries) >= self.maxsize:
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = value
+        return value
+
+# help 命令列表为静态数据，模块加载时构建一次
+HELP_COMMANDS = (
+    # 基础命令
+    ("ls [路径]", "列出目录内容"),
+    ("mode [模式|*]", "设置或查看当前模式（*表示所有模式）"),
+    ("select <选择器>", "设置筛选条件（类似MC选择器）"),
+    ("repair [force]", "修复数据库问题（force强制修复）"),
+    
+    # 玩家相关命令（支持玩家、时间、模式筛选）
+    ("top [数量]", "显示顶级玩家排名"),
+    ("player <玩家名> [模式]", "查看玩家信息"),
+    ("history <玩家名> [模式] [天数]", "查看玩家历史排名并生成图表"),
+    ("compare <玩家1> <玩家2> [...] [模式] [天数]", "比较多个玩家的排名变化"),
+    ("trend <起始日期> [模式] [显示项]", "统计玩家数据变化趋势"),
+    ("search <关键词> [类型] [模式]", "搜索玩家/谱面/创作者"),
+    
+    # 谱面相关命令（支持难度、时间、模式筛选）
+    ("stb_stats [模式]", "谱面基础统计"),
+    ("stb_summary [模式] [级别]", "谱面综合统计报告"),
+    ("stb_hot [模式] [排序] [数量]", "热门谱面排行榜"),
+    ("stb_pie [模式] [类型]", "生成谱面分布饼状图"),
+    ("stb_recent [天数] [模式] [数量]", "查询最近更新的谱面"),
+    ("stb_quality [模式]", "检查数据质量"),
+    ("stb_trends [模式] [周期]", "分析谱面数据趋势"),
+    ("stb_compare [模式列表]", "比较不同模式的谱面数据"),
+    ("stb_stabled_by <玩家名> [模式] [数量]", "查询玩家作为稳定者的谱面统计"),
+    ("stb_top_stabilizers [模式] [数量]", "显示顶级稳定者排行榜"),
+
+    # 其他命令
+    ("alias <原名> <新名>", "设置玩家别名"),
+    ("export <类型> [模式] [天数]", "导出数据为CSV文件"),
+    ("update", "更新数据（调用爬虫脚本）"),
+    ("help [命令]", "显示帮助信息"),
+    ("exit/quit", "退出程序")
+)
+
 class MalodyViz(cmd.Cmd):
     """Malody排行榜数据可视化工具"""
     
@@ -256,12 +427,22 @@ class MalodyViz(cmd.Cmd):
             "提示: 可以使用 " + colorize("ls", Colors.GREEN) + " 命令查看当前目录文件。\n"
     prompt = colorize("(malody-viz) ", Colors.BLUE)
     
+    # 谱面状态名称，类级常量，避免每个命令重复构建同样的字典
+    STATUS_NAMES = {0: "Alpha", 1: "Beta", 2: "Stable"}
+    
     def __init__(self):
         super().__init__()
         self.db_path = "malody_rankings.db"
         self.conn = None
         self.current_mode = -1  # -1 表示所有模式
         self.output_dir = "viz_output"
+        # 按数据库版本失效的查询结果缓存
+        self._chart_stats_cache = GenerationCache(128)  # 键为(筛选条件, 参数)
+        self._latest_crawl_time_cache = GenerationCache(32)  # 键为模式元组
+        self._query_snapshot_cache = GenerationCache(128)  # 排行/热门查询结果快照，键为(SQL, 参数)
+        self._summary_stats_cache = GenerationCache(32)  # 综合统计报告，键为(筛选条件, 参数, 详细级别)
+        # 曾用名全文索引表是否存在，确认存在后不再查询sqlite_master
+        self._has_alias_fts = False
         
         atexit.register(self.cleanup)
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -276,19 +457,8 @@ class MalodyViz(cmd.Cmd):
         self.selector = global_selector
         self.selector.current_mode = self.current_mode
         
-        self.mode_names = {
-            -1: "All",  # 所有模式
-            0: "Key",
-            1: "Step", 
-            2: "DJ",
-            3: "Catch",
-            4: "Pad",
-            5: "Taiko",
-            6: "Ring", 
-            7: "Slide",
-            8: "Live",
-            9: "Cube"
-        }
+        # -1 表示所有模式，其余与选择器共用同一份模式名称
+        self.mode_names = {-1: "All", **dict(enumerate(MODE_NAMES))}
         
         # 自动修复数据库问题
         self.auto_repair_database()
@@ -296,13 +466,28 @@ class MalodyViz(cmd.Cmd):
     def connect_db(self):
         """连接到SQLite数据库"""
         try:
-            self.conn = sqlite3.connect(
-                self.db_path, 
-                detect_types=sqlite3.PARSE_DECLTYPES,
-                check_same_thread=False
-            )
+            # 以只读写(rw)模式打开，数据库不存在时直接报错而不是静默创建空库，无需额外stat检查
+            try:
+                self.conn = sqlite3.connect(
+                    f"file:{self.db_path}?mode=rw",
+                    uri=True,
+                    detect_types=sqlite3.PARSE_DECLTYPES,
+                    check_same_thread=False,
+                    # 各命令按筛选条件拼出的SQL种类较多，扩大预编译语句缓存以便重复执行时跳过解析
+                    cached_statements=256
+                )
+            except sqlite3.OperationalError as e:
+                print(colorize(f"错误: 无法打开数据库文件 '{self.db_path}': {e}", Colors.RED))
+                print(colorize("请确保数据库文件与脚本在同一目录下", Colors.YELLOW))
+                sys.exit(1)
             self.conn.execute("PRAGMA foreign_keys = ON")
             self.conn.execute("PRAGMA busy_timeout = 3000")
+            # 读多写少的分析场景：WAL允许与爬虫写入并发读取，其余参数减少磁盘IO
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.conn.execute("PRAGMA temp_store = MEMORY")
+            self.conn.execute("PRAGMA cache_size = -65536")  # 约64MB页缓存
+            self.conn.execute("PRAGMA mmap_size = 268435456")  # 256MB内存映射
             print(colorize(f"成功连接到数据库: {self.db_path}", Colors.GREEN))
         except sqlite3.Error as e:
             print(colorize(f"数据库连接错误: {e}", Colors.RED))
@@ -311,8 +496,15 @@ class MalodyViz(cmd.Cmd):
     def cleanup(self):
         """清理资源"""
         if self.conn:
+            # 关闭前让SQLite根据本次会话的查询更新规划器统计信息（SQLite官方建议的做法）；
+            # 爬虫写入时可能因锁超时失败，单独捕获，不影响后面关闭连接
+            try:
+                self.conn.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                print(colorize(f"警告: PRAGMA optimize 执行失败: {e}", Colors.YELLOW))
             try:
                 self.conn.close()
+                self.conn = None
                 print(colorize("\n数据库连接已安全关闭", Colors.GREEN))
             except:
                 pass
@@ -351,42 +543,7 @@ class MalodyViz(cmd.Cmd):
             print(colorize("\nMalody排行榜数据可视化工具 - 命令列表", Colors.CYAN))
             print(get_separator())
             
-            commands = [
-                # 基础命令
-                ("ls [路径]", "列出目录内容"),
-                ("mode [模式|*]", "设置或查看当前模式（*表示所有模式）"),
-                ("select <选择器>", "设置筛选条件（类似MC选择器）"),
-                ("repair [force]", "修复数据库问题（force强制修复）"),
-                
-                # 玩家相关命令（支持玩家、时间、模式筛选）
-                ("top [数量]", "显示顶级玩家排名"),
-                ("player <玩家名> [模式]", "查看玩家信息"),
-                ("history <玩家名> [模式] [天数]", "查看玩家历史排名并生成图表"),
-                ("compare <玩家1> <玩家2> [...] [模式] [天数]", "比较多个玩家的排名变化"),
-                ("trend <起始日期> [模式] [显示项]", "统计玩家数据变化趋势"),
-                ("search <关键词> [类型] [模式]", "搜索玩家/谱面/创作者"),
-                
-                # 谱面相关命令（支持难度、时间、模式筛选）
-                ("stb_stats [模式]", "谱面基础统计"),
-                ("stb_summary [模式] [级别]", "谱面综合统计报告"),
-                ("stb_hot [模式] [排序] [数量]", "热门谱面排行榜"),
-                ("stb_pie [模式] [类型]", "生成谱面分布饼状图"),
-                ("stb_recent [天数] [模式] [数量]", "查询最近更新的谱面"),
-                ("stb_quality [模式]", "检查数据质量"),
-                ("stb_trends [模式] [周期]", "分析谱面数据趋势"),
-                ("stb_compare [模式列表]", "比较不同模式的谱面数据"),
-                ("stb_stabled_by <玩家名> [模式] [数量]", "查询玩家作为稳定者的谱面统计"),
-                ("stb_top_stabilizers [模式] [数量]", "显示顶级稳定者排行榜"),
-
-                # 其他命令
-                ("alias <原名> <新名>", "设置玩家别名"),
-                ("export <类型> [模式] [天数]", "导出数据为CSV文件"),
-                ("update", "更新数据（调用爬虫脚本）"),
-                ("help [命令]", "显示帮助信息"),
-                ("exit/quit", "退出程序")
-            ]
-            
-            for cmd, desc in commands:
+            for cmd, desc in HELP_COMMANDS:
                 print(f"  {colorize(cmd, Colors.GREEN):<35} {desc}")
             print(colorize("\n选择器格式说明:", Colors.CYAN))
             print(get_subseparator())
@@ -634,7 +791,7 @@ class MalodyViz(cmd.Cmd):
                 # 显示修复后的状态分布
                 cursor.execute("SELECT status, COUNT(*) FROM charts GROUP BY status ORDER BY status")
                 status_dist = cursor.fetchall()
-                status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+                status_names = self.STATUS_NAMES
                 
                 print(colorize("\n修复后状态分布:", Colors.CYAN))
                 for status, count in status_dist:
@@ -718,6 +875,43 @@ class MalodyViz(cmd.Cmd):
         except ValueError:
             print(colorize("错误: 请输入有效的模式数字(0-9)或*", Colors.RED))
 
+    def _get_latest_crawl_time(self, cursor, modes=None):
+        """获取指定模式的最新爬取时间（数据库中的原始文本），modes为None时使用选择器中的模式
+        
+        单一模式用 ORDER BY crawl_time DESC LIMIT 1，可沿 (mode, crawl_time) 索引倒序取第一条后立即停止；
+        多个模式或不限模式时 MAX(crawl_time) 直接走覆盖索引，ORDER BY 反而需要额外排序
+        """
+        if modes is None:
+            if self.selector.filters['modes']:
+                modes = self.selector.filters['modes']
+            elif self.selector.current_mode != -1:
+                modes = [self.selector.current_mode]
+            else:
+                modes = []
+        
+        def query_latest_time():
+            if len(modes) == 1:
+                # 取原始文本，与MAX()分支的返回值一致，不经过timestamp转换器
+                cursor.execute(
+                    "SELECT CAST(crawl_time AS TEXT) FROM player_rankings WHERE mode = ? ORDER BY crawl_time DESC LIMIT 1",
+                    (modes[0],)
+                )
+            elif modes:
+                mode_condition, mode_param = build_in_condition("mode", modes)
+                cursor.execute(
+                    f"SELECT MAX(crawl_time) FROM player_rankings WHERE {mode_condition}",
+                    (mode_param,)
+                )
+            else:
+                cursor.execute("SELECT MAX(crawl_time) FROM player_rankings")
+            row = cursor.fetchone()
+            return row[0] if row else None
+        
+        # 爬虫写入新数据后数据库版本会变化，版本未变时直接返回缓存值
+        return self._latest_crawl_time_cache.get_or_compute(
+            self._db_generation(cursor), tuple(sorted(modes)), query_latest_time
+        )
+
     @db_safe_operation
     def do_top(self, arg):
         """
@@ -746,21 +940,7 @@ class MalodyViz(cmd.Cmd):
         where_clause, params = self.selector.build_player_sql_where("pr")
         
         # 获取最新爬取时间
-        if self.selector.filters['modes']:
-            mode_condition = "pr.mode IN ({})".format(','.join(['?']*len(self.selector.filters['modes'])))
-            cursor.execute(
-                f"SELECT MAX(crawl_time) FROM player_rankings pr WHERE {mode_condition}",
-                self.selector.filters['modes']
-            )
-        elif self.selector.current_mode != -1:
-            cursor.execute(
-                "SELECT MAX(crawl_time) FROM player_rankings WHERE mode = ?",
-                (self.selector.current_mode,)
-            )
-        else:
-            cursor.execute("SELECT MAX(crawl_time) FROM player_rankings")
-        
-        latest_time = cursor.fetchone()[0]
+        latest_time = self._get_latest_crawl_time(cursor)
         
         if not latest_time:
             print(colorize("没有找到数据", Colors.YELLOW))
@@ -781,8 +961,7 @@ class MalodyViz(cmd.Cmd):
         """
         params.append(limit)
         
-        cursor.execute(query, params)
-        players = cursor.fetchall()
+        players = self._fetch_snapshot(cursor, query, params)
         
         if not players:
             print(colorize("没有找到符合条件的玩家", Colors.YELLOW))
@@ -803,7 +982,7 @@ class MalodyViz(cmd.Cmd):
         print(colorize(f"\n顶级玩家排名", Colors.CYAN))
         print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
         if not self.selector.filters['time_range']:
-            print(colorize(f"数据时间: {latest_time}", Colors.YELLOW))
+            print(colorize(f"数据时间: {format_crawl_time(latest_time)}", Colors.YELLOW))
         print(get_separator())
         
         if terminal_width >= 100:
@@ -845,140 +1024,6 @@ class MalodyViz(cmd.Cmd):
                     rank_str, name, lv, exp, acc, combo, pc
                 ))
     
-    @db_safe_operation
-    def do_stb_stabled(self, arg):
-        """
-        统计stable谱面的创作者排行榜（支持选择器筛选）
-        
-        用法: stb_stabled [模式] [数量]
-        参数:
-        模式 - 可选，模式编号，默认为当前模式
-        数量 - 可选，要显示的创作者数量，默认为20
-        
-        示例:
-        stb_stabled        # 当前模式stable谱面创作者排行榜
-        stb_stabled 0 10   # 模式0前10名stable谱面创作者
-        """
-        args = arg.split()
-        mode = self.current_mode
-        limit = 20
-        
-        if args:
-            try:
-                if int(args[0]) in self.mode_names:
-                    mode = int(args[0])
-                    if len(args) > 1:
-                        limit = int(args[1])
-                else:
-                    limit = int(args[0])
-                    if len(args) > 1 and int(args[1]) in self.mode_names:
-                        mode = int(args[1])
-            except ValueError:
-                print(colorize("错误: 请输入有效的数字", Colors.RED))
-                return
-        
-        if limit <= 0:
-            print(colorize("错误: 数量必须大于0", Colors.RED))
-            return
-        
-        cursor = self.conn.cursor()
-        
-        try:
-            # 使用选择器构建谱面查询条件
-            where_clause, params = self.selector.build_chart_sql_where("c")
-            
-            # 确保只统计stable谱面
-            if "c.status IN" in where_clause or "c.status =" in where_clause:
-                # 如果已有状态筛选，确保包含stable状态
-                where_clause = re.sub(r'c\.status IN \(.*?\)|c\.status = \?', 'c.status = 2', where_clause)
-            else:
-                where_clause += " AND c.status = 2" if where_clause != "1=1" else "c.status = 2"
-            
-            # 如果选择器中没有指定模式，使用当前模式
-            if not self.selector.filters['modes'] and self.selector.current_mode != -1:
-                where_clause += " AND c.mode = ?" if where_clause != "1=1" else "c.mode = ?"
-                params.append(mode)
-            
-            # 添加creator_name不为空的条件
-            if where_clause != "1=1":
-                where_clause += " AND c.creator_name IS NOT NULL"
-            else:
-                where_clause = "c.creator_name IS NOT NULL"
-            
-            query = f"""
-            SELECT c.creator_name, COUNT(*) as stable_count,
-                AVG(CAST(c.level AS REAL)) as avg_level,
-                AVG(c.heat) as avg_heat,
-                MAX(c.heat) as max_heat
-            FROM charts c
-            WHERE {where_clause}
-            GROUP BY c.creator_name
-            ORDER BY stable_count DESC, avg_heat DESC
-            LIMIT ?
-            """
-            params.append(limit)
-            
-            # 调试信息
-            print(colorize(f"调试信息:", Colors.YELLOW))
-            print(f"SQL: {query}")
-            print(f"参数: {params}")
-            
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            
-            if not results:
-                print(colorize(f"\n没有找到符合条件的stable谱面", Colors.YELLOW))
-                return
-            
-            # 显示模式信息
-            if self.selector.filters['modes']:
-                mode_str = ", ".join([f"{m}({self.mode_names.get(m, '未知')})" for m in self.selector.filters['modes']])
-            elif self.selector.current_mode != -1:
-                mode_str = f"{self.selector.current_mode}({self.mode_names.get(self.selector.current_mode, '未知')})"
-            else:
-                mode_str = "所有模式"
-            
-            print(colorize(f"\nStable谱面创作者排行榜", Colors.CYAN))
-            print(colorize(f"模式: {mode_str}", Colors.YELLOW))
-            print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
-            print(get_separator())
-            
-            # 显示表头
-            header_format = "{:<4} {:<20} {:<8} {:<10} {:<10} {:<10}"
-            print(colorize(header_format.format(
-                "排名", "创作者", "Stable数", "平均难度", "平均热度", "最高热度"
-            ), Colors.BOLD))
-            print(get_separator())
-            
-            # 显示数据
-            for i, (creator, count, avg_level, avg_heat, max_heat) in enumerate(results, 1):
-                # 处理过长的创作者名
-                display_creator = creator if len(creator) <= 20 else creator[:17] + "..."
-                
-                print(header_format.format(
-                    f"#{i}",
-                    display_creator,
-                    count,
-                    f"{avg_level:.1f}" if avg_level else "N/A",
-                    f"{avg_heat:.1f}" if avg_heat else "N/A",
-                    f"{max_heat:.0f}" if max_heat else "N/A"
-                ))
-            
-            print(get_separator())
-            
-            # 生成图表的选项
-            chart_choice = input(colorize("\n是否生成图表? (y/N): ", Colors.CYAN)).lower()
-            if chart_choice == 'y':
-                self._generate_stabled_chart(results, mode_str)
-                
-        except sqlite3.Error as e:
-            print(colorize(f"数据库错误: {e}", Colors.RED))
-            # 打印详细的调试信息
-            print(colorize(f"有问题的SQL: {query}", Colors.YELLOW))
-            print(colorize(f"参数: {params}", Colors.YELLOW))
-        except Exception as e:
-            print(colorize(f"操作错误: {e}", Colors.RED))
-
     def _generate_stabled_chart(self, results, mode_str):
         """生成stable创作者统计图表"""
         if not results:
@@ -1118,9 +1163,7 @@ class MalodyViz(cmd.Cmd):
             wedges, texts, autotexts = ax2.pie(level_values, labels=level_labels, autopct='%1.1f%%',
                                             colors=colors, startangle=90)
             
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
+            plt.setp(autotexts, color='white', fontweight='bold')
             
             ax2.set_title('难度分布')
         else:
@@ -1410,68 +1453,50 @@ class MalodyViz(cmd.Cmd):
         # 判断是UID还是名称
         if identifier.isdigit():
             # UID查询
-            cursor.execute(
-                "SELECT player_id FROM player_identity WHERE uid = ?", 
-                (identifier,)
-            )
+            identity_query = "SELECT player_id FROM player_identity WHERE uid = ? LIMIT 1"
         else:
             # 名称查询
-            cursor.execute(
-                "SELECT player_id FROM player_aliases WHERE alias = ?",
-                (identifier,)
-            )
-        
-        result = cursor.fetchone()
-        
-        if not result:
-            print(colorize(f"\n未找到玩家: {identifier}", Colors.YELLOW))
-            return
-        
-        player_id = result[0]
+            identity_query = "SELECT player_id FROM player_aliases WHERE alias = ? LIMIT 1"
         
         # 构建查询条件 - 使用参数中的模式，但应用选择器的其他筛选
-        where_conditions = ["pr.player_id = ?", "pr.mode = ?"]
-        query_params = [player_id, mode]
+        join_conditions = ["pr.player_id = p.player_id", "pr.mode = ?"]
+        query_params = [identifier, mode]
         
         # 应用选择器的时间筛选（如果有）
         if self.selector.filters['time_range']:
-            where_conditions.append("pr.crawl_time BETWEEN ? AND ?")
-            query_params.extend([
-                self.selector.filters['time_range']['start'],
-                self.selector.filters['time_range']['end']
-            ])
-        else:
-            # 如果没有时间筛选，获取最新数据
-            cursor.execute(
-                "SELECT MAX(crawl_time) FROM player_rankings WHERE player_id = ? AND mode = ?",
-                (player_id, mode)
-            )
-            latest_time = cursor.fetchone()[0]
-            if latest_time:
-                where_conditions.append("pr.crawl_time = ?")
-                query_params.append(latest_time)
-        
-        where_clause = " AND ".join(where_conditions)
-        
+            time_condition, time_params = self.selector.build_time_condition("pr.crawl_time")
+            join_conditions.append(time_condition)
+            query_params.extend(time_params)
+        # 没有时间筛选时，按crawl_time倒序取第一条即为最新数据
+        
+        # 玩家解析、排名数据和曾用名在一次查询中取回：
+        # 找不到玩家时没有结果行，玩家存在但无排名数据时排名列为NULL
+        join_clause = " AND ".join(join_conditions)
         cursor.execute(
             f"""
-            SELECT pr.rank, pr.lv, pr.exp, pr.acc, pr.combo, pr.pc, pr.crawl_time
-            FROM player_rankings pr
-            WHERE {where_clause}
+            WITH p AS ({identity_query})
+            SELECT pr.rank, pr.lv, pr.exp, pr.acc, pr.combo, pr.pc, pr.crawl_time,
+                   (SELECT group_concat(alias, char(31)) FROM player_aliases WHERE player_id = p.player_id)
+            FROM p
+            LEFT JOIN player_rankings pr ON {join_clause}
             ORDER BY pr.crawl_time DESC
             LIMIT 1
             """,
             query_params
         )
         
-        player_data = cursor.fetchone()
+        result = cursor.fetchone()
+        
+        if not result:
+            print(colorize(f"\n未找到玩家: {identifier}", Colors.YELLOW))
+            return
+        
+        rank, lv, exp, acc, combo, pc, crawl_time, alias_list = result
         
-        if not player_data:
+        if crawl_time is None:
             mode_name = self.mode_names.get(mode, "未知")
             print(colorize(f"\n玩家 {identifier} 在模式 {mode} ({mode_name}) 中没有数据", Colors.YELLOW))
             return
-                
-        rank, lv, exp, acc, combo, pc, crawl_time = player_data
             
         mode_name = self.mode_names.get(mode, "未知")
         print(colorize(f"\n玩家: {identifier} (模式 {mode} - {mode_name})", Colors.CYAN))
@@ -1485,11 +1510,7 @@ class MalodyViz(cmd.Cmd):
         print(f"最大连击: {combo}")
         print(f"游玩次数: {pc}")
         
-        cursor.execute(
-            "SELECT alias FROM player_aliases WHERE player_id = ?",
-            (player_id,)
-        )
-        aliases = [row[0] for row in cursor.fetchall()]
+        aliases = alias_list.split("\x1f") if alias_list else []
         
         if len(aliases) > 1:
             print(f"曾用名: {', '.join(aliases)}")
@@ -1582,11 +1603,17 @@ class MalodyViz(cmd.Cmd):
             print(colorize(f"\n玩家 {player_name} 在模式 {mode} ({mode_name}) 中最近 {days} 天没有数据", Colors.YELLOW))
             return
         
-        dates = [row[1] for row in history_data]
-        ranks = [row[0] for row in history_data]
+        # 转成列式numpy数组，后续降采样和绘图都直接基于数组操作
+        ranks, dates = history_columns(history_data)
         
         fig, ax = plt.subplots(figsize=(12, 6))
-        ax.plot(dates, ranks, 'o-', linewidth=2, markersize=4)
+        
+        # 数据点远多于图表像素时先做M4降采样，减少需要绘制的顶点数
+        keep = m4_downsample_indices(dates, ranks, int(fig.get_figwidth() * fig.dpi))
+        if len(keep) < len(dates):
+            dates, ranks = dates[keep], ranks[keep]
+        
+        ax.plot(dates, ranks, history_line_fmt(len(dates)), linewidth=2, markersize=4)
         ax.invert_yaxis()
         mode_name = self.mode_names.get(mode, "未知")
         
@@ -1599,6 +1626,7 @@ class MalodyViz(cmd.Cmd):
         # 设置刻度颜色
         ax.tick_params(colors='black')
         
+        ax.xaxis_date()  # x轴数据已是matplotlib日期数值
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
         ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1))
         fig.autofmt_xdate()
@@ -1702,17 +1730,20 @@ class MalodyViz(cmd.Cmd):
                 query_params
             )
             
-            history_data = cursor.fetchall()
+            # 直接从游标读取为列式numpy数组，后续降采样和绘图都直接基于数组操作
+            ranks, dates = history_columns(cursor)
             
-            if not history_data:
+            if len(ranks) == 0:
                 mode_name = self.mode_names.get(mode, "未知")
                 print(colorize(f"\n玩家 {player_name} 在模式 {mode} ({mode_name}) 中最近 {days} 天没有数据", Colors.YELLOW))
                 continue
             
-            dates = [row[1] for row in history_data]
-            ranks = [row[0] for row in history_data]
+            # 数据点远多于图表像素时先做M4降采样，减少需要绘制的顶点数
+            keep = m4_downsample_indices(dates, ranks, int(fig.get_figwidth() * fig.dpi))
+            if len(keep) < len(dates):
+                dates, ranks = dates[keep], ranks[keep]
             
-            ax.plot(dates, ranks, 'o-', linewidth=2, markersize=4, 
+            ax.plot(dates, ranks, history_line_fmt(len(dates)), linewidth=2, markersize=4, 
                 color=colors[idx], label=player_name)
         
         ax.invert_yaxis()
@@ -1726,6 +1757,7 @@ class MalodyViz(cmd.Cmd):
         ax.legend()
         ax.tick_params(colors='black')
         
+        ax.xaxis_date()  # x轴数据已是matplotlib日期数值
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
         ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1))
         fig.autofmt_xdate()
@@ -1778,18 +1810,15 @@ class MalodyViz(cmd.Cmd):
         
         cursor = self.conn.cursor()
         
-        cursor.execute(
-            "SELECT MAX(crawl_time) FROM player_rankings WHERE mode = ?",
-            (mode,)
-        )
-        latest_time = cursor.fetchone()[0]
+        latest_time = self._get_latest_crawl_time(cursor, [mode])
         
         if not latest_time:
             mode_name = self.mode_names.get(mode, "未知")
             print(colorize(f"\n模式 {mode} ({mode_name}) 没有数据", Colors.YELLOW))
             return
         
-        cursor.execute(
+        players = self._fetch_snapshot(
+            cursor,
             """
             SELECT pr.rank, pr.name, pr.acc, pr.exp
             FROM player_rankings pr
@@ -1800,17 +1829,13 @@ class MalodyViz(cmd.Cmd):
             (mode, latest_time, limit)
         )
         
-        players = cursor.fetchall()
-        
         if not players:
             mode_name = self.mode_names.get(mode, "未知")
             print(colorize(f"\n模式 {mode} ({mode_name}) 没有找到玩家数据", Colors.YELLOW))
             return
         
-        ranks = [p[0] for p in players]
-        names = [p[1] for p in players]
-        accuracies = [p[2] for p in players]
-        exps = [p[3] for p in players]
+        # 一次转置得到各列，代替对每行按下标逐列取值
+        ranks, names, accuracies, exps = map(list, zip(*players))
         
         # 创建更大的图表以适应更多玩家名
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 12))
@@ -1885,7 +1910,8 @@ class MalodyViz(cmd.Cmd):
         smart_label_placement(ax1, bars, accuracies, y_offset_factor=0.02, rotation=45)
         
         # 在x轴下方添加玩家名字，使用更智能的布局
-        name_y_pos = -0.08 * max(acc_diffs) if max(acc_diffs) > 0 else -0.1
+        max_acc_diff = max(acc_diffs)
+        name_y_pos = -0.08 * max_acc_diff if max_acc_diff > 0 else -0.1
         
         for i, (bar, name) in enumerate(zip(bars, names)):
             # 截断过长的名字
@@ -2075,15 +2101,16 @@ class MalodyViz(cmd.Cmd):
         cursor = self.conn.cursor()
         
         # 获取起始日期的数据（如果一天内有多个数据，取第一个）
+        # 直接比较crawl_time原始值（当天零点起），以便使用(mode, crawl_time)索引
         cursor.execute(
             """
             SELECT crawl_time 
             FROM player_rankings 
-            WHERE mode = ? AND DATE(crawl_time) >= DATE(?)
+            WHERE mode = ? AND crawl_time >= ?
             ORDER BY crawl_time
             LIMIT 1
             """,
-            (mode, start_date)
+            (mode, start_date.strftime("%Y-%m-%d"))
         )
         
         start_result = cursor.fetchone()
@@ -2095,185 +2122,29 @@ class MalodyViz(cmd.Cmd):
         start_crawl_time = start_result[0]
         
         # 获取最新数据
-        cursor.execute(
-            "SELECT MAX(crawl_time) FROM player_rankings WHERE mode = ?",
-            (mode,)
-        )
-        end_crawl_time = cursor.fetchone()[0]
+        end_crawl_time = self._get_latest_crawl_time(cursor, [mode])
         
         if not end_crawl_time:
             print(colorize(f"错误: 模式 {mode} 没有最新数据", Colors.RED))
             return
         
-        # 获取起始日期的玩家数据
-        cursor.execute(
-            """
-            SELECT player_id, name, rank, lv, exp, acc, combo, pc
-            FROM player_rankings
-            WHERE mode = ? AND crawl_time = ?
-            ORDER BY rank
-            """,
-            (mode, start_crawl_time)
-        )
-        
-        start_players = {row[0]: (row[1], row[2], row[3], row[4], row[5], row[6], row[7]) for row in cursor.fetchall()}
-        
-        # 获取最新日期的玩家数据
-        cursor.execute(
-            """
-            SELECT player_id, name, rank, lv, exp, acc, combo, pc
-            FROM player_rankings
-            WHERE mode = ? AND crawl_time = ?
-            ORDER BY rank
-            """,
-            (mode, end_crawl_time)
-        )
-        
-        end_players = {row[0]: (row[1], row[2], row[3], row[4], row[5], row[6], row[7]) for row in cursor.fetchall()}
-        
-        # 分析变化
-        all_player_ids = set(start_players.keys()) | set(end_players.keys())
+        # 一次查询得到起止快照的对比结果及各项变化量
+        cursor.execute(_TREND_SQL, (mode, start_crawl_time, mode, end_crawl_time))
         
-        trend_data = []
-        
-        for player_id in all_player_ids:
-            in_start = player_id in start_players
-            in_end = player_id in end_players
-            
-            if in_start and in_end:
-                # 一直在榜的玩家
-                start_name, start_rank, start_lv, start_exp, start_acc, start_combo, start_pc = start_players[player_id]
-                end_name, end_rank, end_lv, end_exp, end_acc, end_combo, end_pc = end_players[player_id]
-                
-                # 检查是否改名
-                current_name = end_name if end_name != start_name else start_name
-                
-                # 检查是否有任何变化
-                has_changes = (
-                    start_rank != end_rank or
-                    start_lv != end_lv or
-                    start_exp != end_exp or
-                    start_acc != end_acc or
-                    start_combo != end_combo or
-                    start_pc != end_pc
-                )
-                
-                # 如果用户指定了显示字段，检查这些字段是否有变化
-                if display_fields:
-                    field_has_changes = False
-                    for field in display_fields:
-                        if field == "rank" and start_rank != end_rank:
-                            field_has_changes = True
-                            break
-                        elif field == "lv" and start_lv != end_lv:
-                            field_has_changes = True
-                            break
-                        elif field == "exp" and start_exp != end_exp:
-                            field_has_changes = True
-                            break
-                        elif field == "acc" and start_acc != end_acc:
-                            field_has_changes = True
-                            break
-                        elif field == "combo" and start_combo != end_combo:
-                            field_has_changes = True
-                            break
-                        elif field == "pc" and start_pc != end_pc:
-                            field_has_changes = True
-                            break
-                    
-                    # 如果没有变化且用户指定了显示字段，跳过这个玩家
-                    if not field_has_changes:
-                        continue
-                
-                trend_data.append({
-                    'player_id': player_id,
-                    'name': current_name,
-                    'status': '=',  # 一直在榜
-                    'start_rank': start_rank,
-                    'end_rank': end_rank,
-                    'rank_change': end_rank - start_rank,  # 负数表示进步
-                    'start_lv': start_lv,
-                    'end_lv': end_lv,
-                    'lv_change': end_lv - start_lv,
-                    'start_exp': start_exp,
-                    'end_exp': end_exp,
-                    'exp_change': end_exp - start_exp,
-                    'start_acc': start_acc,
-                    'end_acc': end_acc,
-                    'acc_change': end_acc - start_acc,
-                    'start_combo': start_combo,
-                    'end_combo': end_combo,
-                    'combo_change': end_combo - start_combo,
-                    'start_pc': start_pc,
-                    'end_pc': end_pc,
-                    'pc_change': end_pc - start_pc,
-                    'has_changes': has_changes
-                })
-            elif in_start and not in_end:
-                # 掉出榜的玩家
-                start_name, start_rank, start_lv, start_exp, start_acc, start_combo, start_pc = start_players[player_id]
-                
-                trend_data.append({
-                    'player_id': player_id,
-                    'name': start_name,
-                    'status': '-',  # 掉出榜
-                    'start_rank': start_rank,
-                    'end_rank': None,
-                    'rank_change': None,
-                    'start_lv': start_lv,
-                    'end_lv': None,
-                    'lv_change': None,
-                    'start_exp': start_exp,
-                    'end_exp': None,
-                    'exp_change': None,
-                    'start_acc': start_acc,
-                    'end_acc': None,
-                    'acc_change': None,
-                    'start_combo': start_combo,
-                    'end_combo': None,
-                    'combo_change': None,
-                    'start_pc': start_pc,
-                    'end_pc': None,
-                    'pc_change': None,
-                    'has_changes': True  # 掉出榜本身就是变化
-                })
-            else:
-                # 新上榜的玩家
-                end_name, end_rank, end_lv, end_exp, end_acc, end_combo, end_pc = end_players[player_id]
-                
-                trend_data.append({
-                    'player_id': player_id,
-                    'name': end_name,
-                    'status': '+',  # 新上榜
-                    'start_rank': None,
-                    'end_rank': end_rank,
-                    'rank_change': None,
-                    'start_lv': None,
-                    'end_lv': end_lv,
-                    'lv_change': None,
-                    'start_exp': None,
-                    'end_exp': end_exp,
-                    'exp_change': None,
-                    'start_acc': None,
-                    'end_acc': end_acc,
-                    'acc_change': None,
-                    'start_combo': None,
-                    'end_combo': end_combo,
-                    'combo_change': None,
-                    'start_pc': None,
-                    'end_pc': end_pc,
-                    'pc_change': None,
-                    'has_changes': True  # 新上榜本身就是变化
-                })
+        # 直接迭代游标逐批取行，不先用fetchall构建完整的中间列表
+        change_fields = [f"{field}_change" for field in display_fields]
+        trend_data = [
+            player for player in map(TrendRow._make, cursor)
+            # 一直在榜的玩家只保留所选显示项中有变化的
+            if player.status != '=' or not change_fields
+            or any(getattr(player, field) != 0 for field in change_fields)
+        ]
         
         # 如果没有数据，显示提示
         if not trend_data:
             print(colorize(f"\n在指定的时间范围内，模式 {mode} 没有发现数据变化", Colors.YELLOW))
             return
         
-        # 按结束排名排序（掉出榜的玩家排最后）
-        trend_data.sort(key=lambda x: (x['end_rank'] is None, x['end_rank'] or 9999))
-        
         # 显示结果
         mode_name = self.mode_names.get(mode, "未知")
         print(colorize(f"\n玩家数据变化趋势 (模式 {mode} - {mode_name})", Colors.CYAN))
@@ -2331,7 +2202,7 @@ class MalodyViz(cmd.Cmd):
             row_parts = []
             
             # 状态和玩家名
-            status_symbol = player['status']
+            status_symbol = player.status
             if status_symbol == '+':
                 status_display = colorize("[+]", Colors.GREEN)
             elif status_symbol == '-':
@@ -2340,7 +2211,7 @@ class MalodyViz(cmd.Cmd):
                 status_display = colorize("[=]", Colors.BLUE)
             
             # 处理玩家名长度
-            player_name = player['name']
+            player_name = player.name
             max_name_width = format_specs[1]
             if len(player_name) > max_name_width:
                 player_name = player_name[:max_name_width-3] + "..."
@@ -2351,39 +2222,39 @@ class MalodyViz(cmd.Cmd):
             for field in display_fields:
                 if field == "rank":
                     row_parts.extend([
-                        str(player['start_rank']) if player['start_rank'] is not None else "N/A",
-                        str(player['end_rank']) if player['end_rank'] is not None else "掉出",
-                        format_change(player['rank_change'], reverse=True)  # 排名变化：负数表示进步
+                        str(player.start_rank) if player.start_rank is not None else "N/A",
+                        str(player.end_rank) if player.end_rank is not None else "掉出",
+                        format_change(player.rank_change, reverse=True)  # 排名变化：负数表示进步
                     ])
                 elif field == "lv":
                     row_parts.extend([
-                        str(player['start_lv']) if player['start_lv'] is not None else "N/A",
-                        str(player['end_lv']) if player['end_lv'] is not None else "N/A",
-                        format_change(player['lv_change'])
+                        str(player.start_lv) if player.start_lv is not None else "N/A",
+                        str(player.end_lv) if player.end_lv is not None else "N/A",
+                        format_change(player.lv_change)
                     ])
                 elif field == "exp":
                     row_parts.extend([
-                        format_number(player['start_exp']) if player['start_exp'] is not None else "N/A",
-                        format_number(player['end_exp']) if player['end_exp'] is not None else "N/A",
-                        format_change(player['exp_change'])
+                        format_number(player.start_exp) if player.start_exp is not None else "N/A",
+                        format_number(player.end_exp) if player.end_exp is not None else "N/A",
+                        format_change(player.exp_change)
                     ])
                 elif field == "acc":
                     row_parts.extend([
-                        f"{player['start_acc']:.2f}%" if player['start_acc'] is not None else "N/A",
-                        f"{player['end_acc']:.2f}%" if player['end_acc'] is not None else "N/A",
-                        format_change(player['acc_change'], is_percent=True)
+                        f"{player.start_acc:.2f}%" if player.start_acc is not None else "N/A",
+                        f"{player.end_acc:.2f}%" if player.end_acc is not None else "N/A",
+                        format_change(player.acc_change, is_percent=True)
                     ])
                 elif field == "combo":
                     row_parts.extend([
-                        format_number(player['start_combo']) if player['start_combo'] is not None else "N/A",
-                        format_number(player['end_combo']) if player['end_combo'] is not None else "N/A",
-                        format_change(player['combo_change'])
+                        format_number(player.start_combo) if player.start_combo is not None else "N/A",
+                        format_number(player.end_combo) if player.end_combo is not None else "N/A",
+                        format_change(player.combo_change)
                     ])
                 elif field == "pc":
                     row_parts.extend([
-                        format_number(player['start_pc']) if player['start_pc'] is not None else "N/A",
-                        format_number(player['end_pc']) if player['end_pc'] is not None else "N/A",
-                        format_change(player['pc_change'])
+                        format_number(player.start_pc) if player.start_pc is not None else "N/A",
+                        format_number(player.end_pc) if player.end_pc is not None else "N/A",
+                        format_change(player.pc_change)
                     ])
             
             print(header_format.format(*row_parts))
@@ -2392,9 +2263,10 @@ class MalodyViz(cmd.Cmd):
         
         # 统计信息
         total_players = len(trend_data)
-        stayed_players = len([p for p in trend_data if p['status'] == '='])
-        dropped_players = len([p for p in trend_data if p['status'] == '-'])
-        new_players = len([p for p in trend_data if p['status'] == '+'])
+        status_counts = Counter(p.status for p in trend_data)
+        stayed_players = status_counts['=']
+        dropped_players = status_counts['-']
+        new_players = status_counts['+']
         
         print(colorize(f"统计: 总计 {total_players} 名玩家 | 一直在榜: {stayed_players} | 掉出榜: {dropped_players} | 新上榜: {new_players}", Colors.YELLOW))
         
@@ -2405,45 +2277,17 @@ class MalodyViz(cmd.Cmd):
             
     def export_trend_data(self, trend_data, display_fields, mode, start_time, end_time):
         """导出趋势数据为CSV文件"""
-        # 构建数据框
-        data_dict = {}
-        
-        # 基本字段
-        data_dict['状态'] = [player['status'] for player in trend_data]
-        data_dict['玩家名'] = [player['name'] for player in trend_data]
-        
-        # 根据选择的字段添加数据
-        if "rank" in display_fields:
-            data_dict['起始排名'] = [player['start_rank'] for player in trend_data]
-            data_dict['结束排名'] = [player['end_rank'] for player in trend_data]
-            data_dict['排名变化'] = [player['rank_change'] for player in trend_data]
-        
-        if "lv" in display_fields:
-            data_dict['起始等级'] = [player['start_lv'] for player in trend_data]
-            data_dict['结束等级'] = [player['end_lv'] for player in trend_data]
-            data_dict['等级变化'] = [player['lv_change'] for player in trend_data]
-        
-        if "exp" in display_fields:
-            data_dict['起始经验'] = [player['start_exp'] for player in trend_data]
-            data_dict['结束经验'] = [player['end_exp'] for player in trend_data]
-            data_dict['经验变化'] = [player['exp_change'] for player in trend_data]
-        
-        if "acc" in display_fields:
-            data_dict['起始准确率'] = [player['start_acc'] for player in trend_data]
-            data_dict['结束准确率'] = [player['end_acc'] for player in trend_data]
-            data_dict['准确率变化'] = [player['acc_change'] for player in trend_data]
-        
-        if "combo" in display_fields:
-            data_dict['起始连击'] = [player['start_combo'] for player in trend_data]
-            data_dict['结束连击'] = [player['end_combo'] for player in trend_data]
-            data_dict['连击变化'] = [player['combo_change'] for player in trend_data]
-        
-        if "pc" in display_fields:
-            data_dict['起始游玩次数'] = [player['start_pc'] for player in trend_data]
-            data_dict['结束游玩次数'] = [player['end_pc'] for player in trend_data]
-            data_dict['游玩次数变化'] = [player['pc_change'] for player in trend_data]
-        
-        df = pd.DataFrame(data_dict)
+        # TrendRow本身是元组，直接按字段整体构建数据框，再选取需要的列并改为中文列名，
+        # 不再对每个字段逐行遍历生成列表
+        columns = {'status': '状态', 'name': '玩家名'}
+        for field, label in (("rank", "排名"), ("lv", "等级"), ("exp", "经验"),
+                             ("acc", "准确率"), ("combo", "连击"), ("pc", "游玩次数")):
+            if field in display_fields:
+                columns[f'start_{field}'] = f'起始{label}'
+                columns[f'end_{field}'] = f'结束{label}'
+                columns[f'{field}_change'] = f'{label}变化'
+        
+        df = pd.DataFrame(trend_data, columns=TrendRow._fields)[list(columns)].rename(columns=columns)
         
         # 生成文件名
         mode_name = self.mode_names.get(mode, "未知")
@@ -2502,39 +2346,43 @@ class MalodyViz(cmd.Cmd):
         else:
             print(colorize(f"错误: 不支持的搜索类型 '{search_type}'", Colors.RED))
 
+    @staticmethod
+    def _reject_short_like_keyword(keyword):
+        """模糊(LIKE)搜索前检查关键词长度，过短时提示并返回True
+        
+        单个ASCII字符的 LIKE '%x%' 几乎匹配所有行，结果没有意义，直接拒绝以免白白扫描；
+        单个中文等非ASCII字符本身就有区分度，仍然允许搜索
+        """
+        if len(keyword) < 2 and keyword.isascii():
+            print(colorize("错误: 英文/数字搜索关键词至少需要2个字符", Colors.RED))
+            return True
+        return False
+    
     def _search_players(self, cursor, keyword, mode):
         """搜索玩家（支持名称和UID）"""
-        # 使用选择器构建玩家查询条件
-        where_clause, params = self.selector.build_player_sql_where("pr")
-        
         if keyword.isdigit():
             # UID搜索
             cursor.execute(
-                f"SELECT pi.player_id, pi.current_name, pi.uid FROM player_identity pi WHERE pi.uid = ?", 
+                "SELECT pi.player_id, pi.current_name, pi.uid "
+                "FROM player_identity pi WHERE pi.uid = ?", 
                 (keyword,)
             )
             result = cursor.fetchone()
             if result:
                 player_id, name, uid = result
-                # 应用选择器筛选查询玩家数据
-                player_where, player_params = self.selector.build_player_sql_where("pr")
-                player_where += " AND pr.player_id = ?"
-                player_params.append(player_id)
-                
                 cursor.execute(
-                    f"""
+                    """
                     SELECT pr.rank, pr.lv, pr.acc, pr.combo, pr.pc, pr.crawl_time
                     FROM player_rankings pr
-                    WHERE {player_where}
+                    WHERE pr.player_id = ? AND pr.mode = ?
                     ORDER BY pr.crawl_time DESC LIMIT 1
                     """,
-                    player_params
+                    (player_id, mode)
                 )
                 player_data = cursor.fetchone()
                 if player_data:
                     rank, lv, acc, combo, pc, crawl_time = player_data
                     print(colorize(f"\n玩家: {name} (UID: {uid})", Colors.CYAN))
-                    print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
                     print(get_separator())
                     print(f"排名: {rank}, 等级: {lv}, 准确率: {acc:.2f}%")
                     print(f"连击: {combo}, 游玩次数: {pc}")
@@ -2542,132 +2390,52 @@ class MalodyViz(cmd.Cmd):
             
             print(colorize(f"未找到UID为 {keyword} 的玩家", Colors.YELLOW))
         else:
-            # 名称搜索 - 应用选择器筛选
-            where_clause += " AND pr.name LIKE ?"
-            params.append(f'%{keyword}%')
-            
-            cursor.execute(
-                f"""
-                SELECT DISTINCT pr.name, pr.rank, pr.lv, pr.acc, pr.crawl_time
-                FROM player_rankings pr
-                WHERE {where_clause}
-                ORDER BY pr.rank LIMIT 10
-                """,
-                params
-            )
-            results = cursor.fetchall()
-            if results:
-                print(colorize(f"\n找到 {len(results)} 个匹配玩家:", Colors.CYAN))
-                print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
-                print(get_separator())
-                for name, rank, lv, acc, crawl_time in results:
-                    print(f"{name}: 排名 {rank}, 等级 {lv}, 准确率 {acc:.2f}%")
-            else:
-                print(colorize(f"未找到包含 '{keyword}' 的玩家", Colors.YELLOW))
-
-        def _search_charts(self, cursor, keyword, mode):
-            """搜索谱面"""
-            # 使用选择器构建谱面查询条件
-            where_clause, params = self.selector.build_chart_sql_where("c")
-            where_clause += " AND (s.title LIKE ? OR s.artist LIKE ?)"
-            params.extend([f'%{keyword}%', f'%{keyword}%'])
-            
-            cursor.execute(
-                f"""
-                SELECT c.cid, c.version, c.level, c.status, s.title, s.artist,
-                    c.creator_name, c.heat, c.donate_count, c.last_updated
-                FROM charts c
-                JOIN songs s ON c.sid = s.sid
-                WHERE {where_clause}
-                ORDER BY c.heat DESC LIMIT 10
-                """,
-                params
-            )
-            results = cursor.fetchall()
-            if results:
-                print(colorize(f"\n找到 {len(results)} 个匹配谱面:", Colors.CYAN))
-                print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
-                print(get_separator())
-                for cid, version, level, status, title, artist, creator, heat, donate, updated in results:
-                    status_name = {0: "Alpha", 1: "Beta", 2: "Stable"}.get(status, "Unknown")
-                    print(f"  {title} - {artist} (Lv.{level})")
-                    print(f"    版本: {version}, 状态: {status_name}, 热度: {heat}")
-                    print(f"    创作者: {creator}, CID: {cid}")
-            else:
-                print(colorize(f"未找到包含 '{keyword}' 的谱面", Colors.YELLOW))
-
-        def _search_creators(self, cursor, keyword, mode):
-            """搜索创作者"""
-            # 使用选择器构建谱面查询条件
-            where_clause, params = self.selector.build_chart_sql_where("c")
-            where_clause += " AND c.creator_name LIKE ?"
-            params.append(f'%{keyword}%')
+            # 名称搜索（纯数字按UID精确查找，不受长度限制）
+            if self._reject_short_like_keyword(keyword):
+                return
+            pattern = f'%{keyword}%'
+            has_alias_fts = len(keyword) >= 3 and self._alias_fts_available(cursor)  # trigram索引至少需要3个字符才能生效
             
-            cursor.execute(
-                f"""
-                SELECT c.creator_name, COUNT(*) as chart_count, 
-                    AVG(c.heat) as avg_heat, MAX(c.heat) as max_heat
-                FROM charts c
-                WHERE {where_clause}
-                GROUP BY c.creator_name
-                ORDER BY chart_count DESC LIMIT 10
-                """,
-                params
-            )
-            results = cursor.fetchall()
-            if results:
-                print(colorize(f"\n找到 {len(results)} 个匹配创作者:", Colors.CYAN))
-                print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
-                print(get_separator())
-                for creator, count, avg_heat, max_heat in results:
-                    print(f"  {creator}: {count} 个谱面")
-                    print(f"    平均热度: {avg_heat:.1f}, 最高热度: {max_heat}")
+            if has_alias_fts:
+                # 先通过曾用名trigram全文索引定位候选玩家，再按player_id索引取排名数据，避免全表LIKE扫描
+                cursor.execute(
+                    """
+                    WITH candidates AS (
+                        SELECT DISTINCT pa.player_id FROM player_aliases pa
+                        WHERE pa.alias_id IN (SELECT rowid FROM player_alias_fts WHERE alias LIKE ?)
+                    )
+                    SELECT DISTINCT pr.name, pr.rank, pr.lv, pr.acc, pr.crawl_time
+                    FROM candidates CROSS JOIN player_rankings pr ON pr.player_id = candidates.player_id
+                    WHERE pr.name LIKE ? AND pr.mode = ?
+                    ORDER BY pr.rank LIMIT 10
+                    """,
+                    (pattern, pattern, mode)
+                )
+            elif len(keyword) >= 3:
+                # 没有全文索引时，较长关键词的匹配行通常很少：在子查询中完成去重，外层再排序取前10条，
+                # 避免规划器沿(mode, rank)顺序逐行回表直到凑满10条（匹配少时几乎要走完整个模式）
+                cursor.execute(
+                    """
+                    SELECT * FROM (
+                        SELECT DISTINCT pr.name, pr.rank, pr.lv, pr.acc, pr.crawl_time
+                        FROM player_rankings pr
+                        WHERE pr.name LIKE ? AND pr.mode = ?
+                    )
+                    ORDER BY rank LIMIT 10
+                    """,
+                    (pattern, mode)
+                )
             else:
-                print(colorize(f"未找到包含 '{keyword}' 的创作者", Colors.YELLOW))
-
-
-    def _search_players(self, cursor, keyword, mode):
-        """搜索玩家（支持名称和UID）"""
-        if keyword.isdigit():
-            # UID搜索
-            cursor.execute(
-                "SELECT pi.player_id, pi.current_name, pi.uid "
-                "FROM player_identity pi WHERE pi.uid = ?", 
-                (keyword,)
-            )
-            result = cursor.fetchone()
-            if result:
-                player_id, name, uid = result
+                # 短关键词匹配行多，沿(mode, rank)顺序扫描凑满10条即可停止
                 cursor.execute(
                     """
-                    SELECT pr.rank, pr.lv, pr.acc, pr.combo, pr.pc, pr.crawl_time
+                    SELECT DISTINCT pr.name, pr.rank, pr.lv, pr.acc, pr.crawl_time
                     FROM player_rankings pr
-                    WHERE pr.player_id = ? AND pr.mode = ?
-                    ORDER BY pr.crawl_time DESC LIMIT 1
+                    WHERE pr.name LIKE ? AND pr.mode = ?
+                    ORDER BY pr.rank LIMIT 10
                     """,
-                    (player_id, mode)
+                    (pattern, mode)
                 )
-                player_data = cursor.fetchone()
-                if player_data:
-                    rank, lv, acc, combo, pc, crawl_time = player_data
-                    print(colorize(f"\n玩家: {name} (UID: {uid})", Colors.CYAN))
-                    print(get_separator())
-                    print(f"排名: {rank}, 等级: {lv}, 准确率: {acc:.2f}%")
-                    print(f"连击: {combo}, 游玩次数: {pc}")
-                    return
-            
-            print(colorize(f"未找到UID为 {keyword} 的玩家", Colors.YELLOW))
-        else:
-            # 名称搜索
-            cursor.execute(
-                """
-                SELECT DISTINCT pr.name, pr.rank, pr.lv, pr.acc, pr.crawl_time
-                FROM player_rankings pr
-                WHERE pr.name LIKE ? AND pr.mode = ?
-                ORDER BY pr.rank LIMIT 10
-                """,
-                (f'%{keyword}%', mode)
-            )
             results = cursor.fetchall()
             if results:
                 print(colorize(f"\n找到 {len(results)} 个匹配玩家:", Colors.CYAN))
@@ -2679,6 +2447,8 @@ class MalodyViz(cmd.Cmd):
     
     def _search_charts(self, cursor, keyword, mode):
         """搜索谱面"""
+        if self._reject_short_like_keyword(keyword):
+            return
         cursor.execute(
             """
             SELECT c.cid, c.version, c.level, c.status, s.title, s.artist,
@@ -2704,6 +2474,8 @@ class MalodyViz(cmd.Cmd):
     
     def _search_creators(self, cursor, keyword, mode):
         """搜索创作者"""
+        if self._reject_short_like_keyword(keyword):
+            return
         cursor.execute(
             """
             SELECT creator_name, COUNT(*) as chart_count, 
@@ -2725,56 +2497,78 @@ class MalodyViz(cmd.Cmd):
         else:
             print(colorize(f"未找到包含 '{keyword}' 的创作者", Colors.YELLOW))
 
-    @db_safe_operation
-    def do_stb_stats(self, arg):
-        """
-        谱面基础统计（支持选择器筛选）
+    def _alias_fts_available(self, cursor):
+        """检查曾用名全文索引表是否存在
         
-        用法: stb_stats [模式]
-        参数:
-        模式 - 可选，模式编号，默认为当前模式
-        
-        示例:
-        stb_stats      # 当前模式统计
-        stb_stats 0    # 模式0统计
+        运行期间表结构不会被删除，确认存在后直接使用缓存结果；
+        不存在时每次重新检查，以便查看器运行中爬虫建表后即可用上索引
         """
-        args = arg.split()
-        mode = self.current_mode
-        if args:
-            try:
-                mode = int(args[0])
-            except ValueError:
-                print(colorize("错误: 模式必须是数字", Colors.RED))
-                return
-        
-        cursor = self.conn.cursor()
-        
-        # 使用选择器构建谱面查询条件
-        where_clause, params = self.selector.build_chart_sql_where("c")
-        
-        # 如果选择器中没有指定模式，使用当前模式
-        if not self.selector.filters['modes'] and self.selector.current_mode != -1:
-            where_clause += " AND c.mode = ?" if where_clause != "1=1" else "c.mode = ?"
-            params.append(mode)
+        if not self._has_alias_fts:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'player_alias_fts'")
+            self._has_alias_fts = cursor.fetchone() is not None
+        return self._has_alias_fts
+    
+    def _db_generation(self, cursor):
+        """获取数据库版本标识：data_version反映其他连接的提交，total_changes反映本连接的写入"""
+        cursor.execute("PRAGMA data_version")
+        return cursor.fetchone()[0], self.conn.total_changes
+    
+    def _fetch_snapshot(self, cursor, query, params):
+        """执行只读查询并按数据库版本缓存结果
         
-        stats = self._get_chart_stats(cursor, where_clause, params)
-        self._display_chart_stats(stats, mode)
-        self._display_chart_stats(stats, mode)
-
+        排行榜、热门谱面等查询的参数组合很少且会被反复查看，
+        爬虫写入新数据前直接返回上次的结果快照
+        """
+        rows = self._query_snapshot_cache.get_or_compute(
+            self._db_generation(cursor), (query, tuple(params)),
+            lambda: cursor.execute(query, params).fetchall()
+        )
+        return list(rows)
+    
     def _get_chart_stats(self, cursor, where_clause, params):
         """获取谱面统计信息"""
+        try:
+            # 统计结果只取决于筛选条件和数据库内容，数据库未变化时直接复用上次结果
+            return self._chart_stats_cache.get_or_compute(
+                self._db_generation(cursor), (where_clause, tuple(params)),
+                lambda: self._query_chart_stats(cursor, where_clause, params)
+            )
+        except Exception as e:
+            print(colorize(f"获取统计信息时出错: {e}", Colors.RED))
+            # 返回空的统计字典
+            return {
+                'total_charts': 0,
+                'status_dist': (0, 0, 0),
+                'level_dist': {},
+                'top_creators': [],
+                'heat_avg': 0,
+                'heat_max': 0,
+                'donate_avg': 0,
+                'donate_max': 0
+            }
+    
+    def _query_chart_stats(self, cursor, where_clause, params):
+        """执行谱面统计查询"""
         stats = {}
         
-        # 总谱面数
-        cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause}", params)
-        stats['total_charts'] = cursor.fetchone()[0]
-        
-        # 按状态统计
+        # 总谱面数、状态分布与热度统计合并为一次聚合查询
         cursor.execute(
-            f"SELECT c.status, COUNT(*) FROM charts c WHERE {where_clause} GROUP BY c.status",
+            f"""
+            SELECT COUNT(*),
+                   SUM(CASE WHEN c.status = 0 THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN c.status = 1 THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN c.status = 2 THEN 1 ELSE 0 END),
+                   AVG(c.heat), MAX(c.heat), AVG(c.donate_count), MAX(c.donate_count)
+            FROM charts c WHERE {where_clause}
+            """,
             params
         )
-        stats['status_dist'] = dict(cursor.fetchall())
+        (total_charts, alpha_count, beta_count, stable_count,
+         heat_avg, heat_max, donate_avg, donate_max) = cursor.fetchone()
+        stats['total_charts'] = total_charts
+        
+        # 状态只有0/1/2三种，按状态编号存为元组，确保所有状态都显示，即使数量为0
+        stats['status_dist'] = (alpha_count or 0, beta_count or 0, stable_count or 0)
         
         # 难度统计 - 修复空字符串问题
         cursor.execute(
@@ -2790,114 +2584,8 @@ class MalodyViz(cmd.Cmd):
         )
         stats['top_creators'] = cursor.fetchall()
         
-        # 热度统计
-        cursor.execute(
-            f"SELECT AVG(c.heat), MAX(c.heat), AVG(c.donate_count), MAX(c.donate_count) FROM charts c WHERE {where_clause}",
-            params
-        )
-        heat_stats = cursor.fetchone()
-        stats['heat_avg'], stats['heat_max'], stats['donate_avg'], stats['donate_max'] = heat_stats or (0, 0, 0, 0)
-        
-        return stats
-    
-    def _display_chart_stats(self, stats, mode):
-        """显示谱面统计信息"""
-        mode_name = self.mode_names.get(mode, "未知")
-        
-        print(colorize(f"\n谱面统计 - 模式 {mode} ({mode_name})", Colors.CYAN))
-        print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
-        print(get_separator())
-        
-        if not stats or stats['total_charts'] == 0:
-            print(colorize("没有找到符合条件的谱面", Colors.YELLOW))
-            return
-        
-        print(f"总谱面数: {colorize(stats['total_charts'], Colors.GREEN)}")
-        
-        # 状态分布
-        if stats['status_dist']:
-            print(f"\n{colorize('状态分布:', Colors.BOLD)}")
-            status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
-            for status, count in stats['status_dist'].items():
-                status_name = status_names.get(status, f"未知({status})")
-                print(f"  {status_name}: {count}")
-        
-        # 难度分布
-        if stats['level_dist']:
-            print(f"\n{colorize('难度分布:', Colors.BOLD)}")
-            for level, count in sorted(stats['level_dist'].items(), key=lambda x: float(x[0])):
-                print(f"  Lv.{level}: {count}")
-        
-        # 热门创作者
-        if stats['top_creators']:
-            print(f"\n{colorize('热门创作者:', Colors.BOLD)}")
-            for creator, count in stats['top_creators']:
-                print(f"  {creator}: {count} 个谱面")
-        
-        # 热度统计
-        print(f"\n{colorize('热度统计:', Colors.BOLD)}")
-        print(f"  平均热度: {stats['heat_avg']:.1f}")
-        print(f"  最高热度: {stats['heat_max']}")
-        print(f"  平均打赏: {stats['donate_avg']:.1f}")
-        print(f"  最多打赏: {stats['donate_max']}")
-
-    def _get_chart_stats(self, cursor, where_clause, params):
-        """获取谱面统计信息"""
-        stats = {}
-        
-        try:
-            # 总谱面数
-            cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause}", params)
-            stats['total_charts'] = cursor.fetchone()[0]
-            
-            # 按状态统计 - 确保正确统计所有状态
-            cursor.execute(
-                f"SELECT c.status, COUNT(*) FROM charts c WHERE {where_clause} GROUP BY c.status",
-                params
-            )
-            status_results = cursor.fetchall()
-            
-            # 确保所有状态都显示，即使数量为0
-            stats['status_dist'] = {0: 0, 1: 0, 2: 0}
-            for status, count in status_results:
-                if status in [0, 1, 2]:
-                    stats['status_dist'][status] = count
-            
-            # 难度统计 - 修复空字符串问题
-            cursor.execute(
-                f"SELECT c.level, COUNT(*) FROM charts c WHERE {where_clause} AND c.level IS NOT NULL AND c.level != '' GROUP BY c.level ORDER BY CAST(c.level AS REAL)",
-                params
-            )
-            stats['level_dist'] = dict(cursor.fetchall())
-            
-            # 创作者统计
-            cursor.execute(
-                f"SELECT c.creator_name, COUNT(*) FROM charts c WHERE {where_clause} AND c.creator_name IS NOT NULL GROUP BY c.creator_name ORDER BY COUNT(*) DESC LIMIT 10",
-                params
-            )
-            stats['top_creators'] = cursor.fetchall()
-            
-            # 热度统计
-            cursor.execute(
-                f"SELECT AVG(c.heat), MAX(c.heat), AVG(c.donate_count), MAX(c.donate_count) FROM charts c WHERE {where_clause}",
-                params
-            )
-            heat_stats = cursor.fetchone()
-            stats['heat_avg'], stats['heat_max'], stats['donate_avg'], stats['donate_max'] = heat_stats or (0, 0, 0, 0)
-            
-        except Exception as e:
-            print(colorize(f"获取统计信息时出错: {e}", Colors.RED))
-            # 返回空的统计字典
-            stats = {
-                'total_charts': 0,
-                'status_dist': {0: 0, 1: 0, 2: 0},
-                'level_dist': {},
-                'top_creators': [],
-                'heat_avg': 0,
-                'heat_max': 0,
-                'donate_avg': 0,
-                'donate_max': 0
-            }
+        stats['heat_avg'], stats['heat_max'] = heat_avg, heat_max
+        stats['donate_avg'], stats['donate_max'] = donate_avg, donate_max
         
         return stats
 
@@ -2960,16 +2648,15 @@ class MalodyViz(cmd.Cmd):
         # 状态分布 - 确保显示所有状态
         if stats['status_dist']:
             print(f"\n{colorize('状态分布:', Colors.BOLD)}")
-            status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
-            for status in [0, 1, 2]:  # 确保按顺序显示所有状态
-                count = stats['status_dist'].get(status, 0)
+            status_names = self.STATUS_NAMES
+            for status, count in enumerate(stats['status_dist']):  # 按顺序显示所有状态
                 status_name = status_names.get(status, f"未知({status})")
                 print(f"  {status_name}: {count}")
         
-        # 难度分布
+        # 难度分布（SQL中已按 CAST(level AS REAL) 排序，dict保持插入顺序，无需再次排序）
         if stats['level_dist']:
             print(f"\n{colorize('难度分布:', Colors.BOLD)}")
-            for level, count in sorted(stats['level_dist'].items(), key=lambda x: float(x[0])):
+            for level, count in stats['level_dist'].items():
                 print(f"  Lv.{level}: {count}")
         
         # 热门创作者
@@ -3002,7 +2689,7 @@ class MalodyViz(cmd.Cmd):
         cursor.execute("SELECT status, COUNT(*) FROM charts GROUP BY status ORDER BY status")
         manual_results = cursor.fetchall()
         
-        status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+        status_names = self.STATUS_NAMES
         for status, count in manual_results:
             status_name = status_names.get(status, f"未知({status})")
             print(f"  状态 {status} ({status_name}): {count} 个谱面")
@@ -3076,7 +2763,7 @@ class MalodyViz(cmd.Cmd):
         cursor.execute("SELECT status, COUNT(*) FROM charts GROUP BY status ORDER BY status")
         status_dist = cursor.fetchall()
         
-        status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+        status_names = self.STATUS_NAMES
         for status, count in status_dist:
             status_name = status_names.get(status, f"未知({status})")
             print(f"  状态 {status} ({status_name}): {count} 个谱面")
@@ -3164,7 +2851,7 @@ class MalodyViz(cmd.Cmd):
             cursor.execute(query, params)
             beta_charts = cursor.fetchall()
             
-            status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+            status_names = self.STATUS_NAMES
             
             if beta_charts:
                 print(f"\n找到 {len(beta_charts)} 个Beta谱面:")
@@ -3249,7 +2936,7 @@ class MalodyViz(cmd.Cmd):
             status_results = cursor.fetchall()
             
             print(f"\n状态详细统计:")
-            status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+            status_names = self.STATUS_NAMES
             for status, count, chart_info in status_results:
                 status_name = status_names.get(status, f"未知({status})")
                 print(f"\n{status_name}({status}): {count} 个谱面")
@@ -3359,7 +3046,7 @@ class MalodyViz(cmd.Cmd):
         cursor.execute("SELECT DISTINCT status, COUNT(*) FROM charts GROUP BY status ORDER BY status")
         status_results = cursor.fetchall()
         
-        status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+        status_names = self.STATUS_NAMES
         for status, count in status_results:
             status_name = status_names.get(status, f"未知({status})")
             print(f"状态 {status} ({status_name}): {count} 个谱面")
@@ -3431,14 +3118,17 @@ class MalodyViz(cmd.Cmd):
                 print(colorize("错误: 模式必须是数字", Colors.RED))
                 return
         
-        cursor = self.conn.cursor()
-        
-        if chart_type == "status":
-            self._generate_status_pie(cursor, mode)
-        elif chart_type == "level":
-            self._generate_level_pie(cursor, mode)
-        else:
+        # 按图表类型直接分派到对应的生成方法
+        generators = {
+            "status": self._generate_status_pie,
+            "level": self._generate_level_pie,
+        }
+        generator = generators.get(chart_type)
+        if generator is None:
             print(colorize(f"错误: 不支持的图表类型 '{chart_type}'", Colors.RED))
+            return
+        
+        generator(self.conn.cursor(), mode)
 
     def _generate_status_pie(self, cursor, mode):
         """生成状态分布饼图"""
@@ -3460,7 +3150,7 @@ class MalodyViz(cmd.Cmd):
             print(colorize(f"没有找到符合条件的谱面数据", Colors.YELLOW))
             return
         
-        status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+        status_names = self.STATUS_NAMES
         labels = []
         sizes = []
         
@@ -3475,9 +3165,7 @@ class MalodyViz(cmd.Cmd):
                                         colors=colors, startangle=90)
         
         # 美化文本
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
+        plt.setp(autotexts, color='white', fontweight='bold')
         
         mode_name = self.mode_names.get(mode, "未知")
         ax.set_title(f'谱面状态分布 - 模式 {mode} ({mode_name})\n筛选条件: {self.selector.get_current_selection()}', 
@@ -3547,9 +3235,7 @@ class MalodyViz(cmd.Cmd):
         wedges, texts, autotexts = ax.pie(sizes, labels=labels, autopct='%1.1f%%', 
                                         colors=colors, startangle=90)
         
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
+        plt.setp(autotexts, color='white', fontweight='bold')
         
         mode_name = self.mode_names.get(mode, "未知")
         ax.set_title(f'谱面难度分布 - 模式 {mode} ({mode_name})\n筛选条件: {self.selector.get_current_selection()}', 
@@ -3720,8 +3406,7 @@ class MalodyViz(cmd.Cmd):
         """
         params.append(limit)
         
-        cursor.execute(query, params)
-        results = cursor.fetchall()
+        results = self._fetch_snapshot(cursor, query, params)
         
         if not results:
             print(colorize(f"\n没有找到符合条件的谱面", Colors.YELLOW))
@@ -3796,8 +3481,6 @@ class MalodyViz(cmd.Cmd):
 
     def _get_comprehensive_stats(self, cursor, mode, detail_level):
         """获取综合统计数据"""
-        stats = {}
-        
         # 使用选择器构建谱面查询条件
         where_clause, params = self.selector.build_chart_sql_where("c")
         
@@ -3806,33 +3489,36 @@ class MalodyViz(cmd.Cmd):
             where_clause += " AND c.mode = ?" if where_clause != "1=1" else "c.mode = ?"
             params.append(mode)
         
-        # 基础统计
-        cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause}", params)
-        stats['total_charts'] = cursor.fetchone()[0]
-        
-        cursor.execute(f"SELECT COUNT(DISTINCT c.sid) FROM charts c WHERE {where_clause}", params)
-        stats['unique_songs'] = cursor.fetchone()[0]
-        
-        cursor.execute(f"SELECT COUNT(DISTINCT c.creator_name) FROM charts c WHERE {where_clause} AND c.creator_name IS NOT NULL", params)
-        stats['unique_creators'] = cursor.fetchone()[0]
+        # 报告需要多次全表聚合，数据库未变化时直接复用上次结果
+        return self._summary_stats_cache.get_or_compute(
+            self._db_generation(cursor), (where_clause, tuple(params), detail_level),
+            lambda: self._query_comprehensive_stats(cursor, where_clause, params, detail_level)
+        )
+    
+    def _query_comprehensive_stats(self, cursor, where_clause, params, detail_level):
+        """执行综合统计查询"""
+        stats = {}
         
-        # 时间统计
-        cursor.execute(f"SELECT MIN(c.last_updated), MAX(c.last_updated) FROM charts c WHERE {where_clause} AND c.last_updated IS NOT NULL", params)
-        min_max_dates = cursor.fetchone()
-        stats['first_update'] = min_max_dates[0]
-        stats['last_update'] = min_max_dates[1]
+        # 基础统计与时间统计合并为一次扫描（COUNT DISTINCT/MIN/MAX本身会忽略NULL）
+        cursor.execute(
+            f"SELECT COUNT(*), COUNT(DISTINCT c.sid), COUNT(DISTINCT c.creator_name), MIN(c.last_updated), MAX(c.last_updated) FROM charts c WHERE {where_clause}",
+            params
+        )
+        (stats['total_charts'], stats['unique_songs'], stats['unique_creators'],
+         stats['first_update'], stats['last_update']) = cursor.fetchone()
         
-        # 热度统计
+        # 热度统计（SQLite没有STDDEV，取平方的均值后按 E[x²]-E[x]² 计算总体标准差）
         cursor.execute(
-            f"SELECT AVG(c.heat), MAX(c.heat), MIN(c.heat), STDDEV(c.heat) FROM charts c WHERE {where_clause} AND c.heat > 0",
+            f"SELECT AVG(c.heat), MAX(c.heat), MIN(c.heat), AVG(CAST(c.heat AS REAL) * c.heat) FROM charts c WHERE {where_clause} AND c.heat > 0",
             params
         )
-        heat_stats = cursor.fetchone()
+        heat_avg, heat_max, heat_min, heat_sq_avg = cursor.fetchone()
+        heat_std = math.sqrt(max(heat_sq_avg - heat_avg * heat_avg, 0)) if heat_avg is not None else 0
         stats['heat_stats'] = {
-            'avg': heat_stats[0] or 0,
-            'max': heat_stats[1] or 0,
-            'min': heat_stats[2] or 0,
-            'std': heat_stats[3] or 0
+            'avg': heat_avg or 0,
+            'max': heat_max or 0,
+            'min': heat_min or 0,
+            'std': heat_std
         }
         
         # 难度统计
@@ -3868,30 +3554,21 @@ class MalodyViz(cmd.Cmd):
             )
             stats['level_breakdown'] = cursor.fetchall()
             
-            # 热度分布
-            cursor.execute(
-                f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.heat = 0",
-                params
-            )
-            stats['zero_heat'] = cursor.fetchone()[0]
-            
+            # 热度分布，四个区间在同一次扫描中统计
             cursor.execute(
-                f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.heat BETWEEN 1 AND 10",
+                f"""
+                SELECT SUM(CASE WHEN c.heat = 0 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN c.heat BETWEEN 1 AND 10 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN c.heat BETWEEN 11 AND 50 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN c.heat > 50 THEN 1 ELSE 0 END)
+                FROM charts c WHERE {where_clause}
+                """,
                 params
             )
-            stats['low_heat'] = cursor.fetchone()[0]
-            
-            cursor.execute(
-                f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.heat BETWEEN 11 AND 50",
-                params
+            heat_buckets = cursor.fetchone()
+            stats['zero_heat'], stats['low_heat'], stats['medium_heat'], stats['high_heat'] = (
+                count or 0 for count in heat_buckets
             )
-            stats['medium_heat'] = cursor.fetchone()[0]
-            
-            cursor.execute(
-                f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.heat > 50",
-                params
-            )
-            stats['high_heat'] = cursor.fetchone()[0]
             
             # 更新频率统计
             cursor.execute(
@@ -3905,6 +3582,8 @@ class MalodyViz(cmd.Cmd):
     def _display_summary_report(self, stats, mode, detail_level):
         """显示综合统计报告"""
         mode_name = self.mode_names.get(mode, "未知")
+        # 百分比分母，筛选结果为空时避免除以0
+        total_denom = max(stats['total_charts'], 1)
         
         print(colorize(f"\n谱面综合统计报告", Colors.CYAN))
         print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
@@ -3940,24 +3619,24 @@ class MalodyViz(cmd.Cmd):
         
         # 状态分布
         print(colorize("\n📝 状态分布", Colors.BOLD))
-        status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+        status_names = self.STATUS_NAMES
         for status, count in stats['status_dist'].items():
             status_name = status_names.get(status, f"未知({status})")
-            percentage = (count / stats['total_charts']) * 100
+            percentage = (count / total_denom) * 100
             print(f"  {status_name}: {count} ({percentage:.1f}%)")
         
         if detail_level == "detailed":
             # 详细统计
             print(colorize("\n👑 顶级创作者 (前20)", Colors.BOLD))
             for i, (creator, count) in enumerate(stats['top_creators'][:10], 1):
-                percentage = (count / stats['total_charts']) * 100
+                percentage = (count / total_denom) * 100
                 print(f"  {i:2d}. {creator}: {count} 谱面 ({percentage:.1f}%)")
             
             # 热度分布
             print(colorize("\n📈 热度分布", Colors.BOLD))
             total_with_heat = stats['total_charts'] - stats['zero_heat']
             if total_with_heat > 0:
-                print(f"  无热度: {stats['zero_heat']} ({stats['zero_heat']/stats['total_charts']*100:.1f}%)")
+                print(f"  无热度: {stats['zero_heat']} ({stats['zero_heat']/total_denom*100:.1f}%)")
                 print(f"  低热度 (1-10): {stats['low_heat']} ({stats['low_heat']/total_with_heat*100:.1f}%)")
                 print(f"  中热度 (11-50): {stats['medium_heat']} ({stats['medium_heat']/total_with_heat*100:.1f}%)")
                 print(f"  高热度 (50+): {stats['high_heat']} ({stats['high_heat']/total_with_heat*100:.1f}%)")
@@ -3977,7 +3656,7 @@ class MalodyViz(cmd.Cmd):
         fig.suptitle(f'谱面综合统计 - 模式 {mode} ({mode_name})', fontsize=16, fontweight='bold')
         
         # 1. 状态分布饼图
-        status_names = {0: "Alpha", 1: "Beta", 2: "Stable"}
+        status_names = self.STATUS_NAMES
         status_labels = [status_names.get(s, f"未知({s})") for s in stats['status_dist'].keys()]
         status_sizes = list(stats['status_dist'].values())
         
@@ -4001,7 +3680,8 @@ class MalodyViz(cmd.Cmd):
                     f'{value}', ha='center', va='bottom')
         
         # 3. 难度分布柱状图（如果数据存在）
-        if hasattr(stats, 'level_breakdown') and stats['level_breakdown']:
+        # stats是dict，hasattr永远为False，需用get判断键是否存在
+        if stats.get('level_breakdown'):
             levels = [str(item[0]) for item in stats['level_breakdown']]
             counts = [item[1] for item in stats['level_breakdown']]
             
@@ -4014,7 +3694,7 @@ class MalodyViz(cmd.Cmd):
             ax3.set_title('难度分布')
         
         # 4. 创作者排行榜（前10）
-        if hasattr(stats, 'top_creators') and stats['top_creators']:
+        if stats.get('top_creators'):
             creators = [item[0][:15] + '...' if len(item[0]) > 15 else item[0] for item in stats['top_creators'][:10]]
             creator_counts = [item[1] for item in stats['top_creators'][:10]]
             
@@ -4078,36 +3758,42 @@ class MalodyViz(cmd.Cmd):
         # 检查数据完整性
         issues = []
         
+        # 总数、缺失字段、孤立记录与异常值在同一次扫描中统计，避免对charts逐项重复扫描
+        cursor.execute(
+            f"""
+            SELECT COUNT(*),
+                   SUM(c.creator_name IS NULL),
+                   SUM(c.level IS NULL),
+                   SUM(c.last_updated IS NULL),
+                   SUM(s.sid IS NULL),
+                   SUM(c.heat < 0),
+                   SUM(c.donate_count < 0)
+            FROM charts c LEFT JOIN songs s ON c.sid = s.sid
+            WHERE {where_clause}
+            """,
+            params
+        )
+        (total_charts, missing_creator, missing_level, missing_update,
+         orphan_charts, negative_heat, negative_donate) = (count or 0 for count in cursor.fetchone())
+        
         # 1. 检查缺失字段
-        cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.creator_name IS NULL", params)
-        missing_creator = cursor.fetchone()[0]
         if missing_creator > 0:
             issues.append(f"缺失创作者: {missing_creator} 个谱面")
         
-        cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.level IS NULL", params)
-        missing_level = cursor.fetchone()[0]
         if missing_level > 0:
             issues.append(f"缺失难度: {missing_level} 个谱面")
         
-        cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.last_updated IS NULL", params)
-        missing_update = cursor.fetchone()[0]
         if missing_update > 0:
             issues.append(f"缺失更新时间: {missing_update} 个谱面")
         
         # 2. 检查数据一致性
-        cursor.execute(f"SELECT COUNT(*) FROM charts c LEFT JOIN songs s ON c.sid = s.sid WHERE {where_clause} AND s.sid IS NULL", params)
-        orphan_charts = cursor.fetchone()[0]
         if orphan_charts > 0:
             issues.append(f"孤立的谱面记录: {orphan_charts} 个")
         
         # 3. 检查异常值
-        cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.heat < 0", params)
-        negative_heat = cursor.fetchone()[0]
         if negative_heat > 0:
             issues.append(f"负热度值: {negative_heat} 个谱面")
         
-        cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.donate_count < 0", params)
-        negative_donate = cursor.fetchone()[0]
         if negative_donate > 0:
             issues.append(f"负打赏数: {negative_donate} 个谱面")
         
@@ -4120,9 +3806,6 @@ class MalodyViz(cmd.Cmd):
             print(colorize("✅ 数据质量良好，未发现问题", Colors.GREEN))
         
         # 显示数据完整性统计
-        cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause}", params)
-        total_charts = cursor.fetchone()[0]
-        
         completeness_stats = []
         if total_charts > 0:
             completeness_stats.append(f"总谱面数: {total_charts}")
@@ -4232,8 +3915,7 @@ class MalodyViz(cmd.Cmd):
                 print(colorize(f"没有找到趋势数据", Colors.YELLOW))
                 return
             
-            dates = [item[0] for item in trend_data]
-            counts = [item[1] for item in trend_data]
+            dates, counts = map(list, zip(*trend_data))
             
             # 显示趋势统计
             mode_name = self.mode_names.get(mode, "未知")
@@ -4327,37 +4009,32 @@ class MalodyViz(cmd.Cmd):
         print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
         print(get_separator())
         
+        # 使用选择器构建除模式以外的筛选条件，模式由本命令的参数决定（选择器筛选的模式和当前模式都不生效）
+        where_clause, params = self.selector.build_chart_sql_where("c", overrides={'modes': []}, use_current_mode=False)
+        
+        # 一次GROUP BY查询得到所有模式的统计，避免每个模式单独执行5条查询
+        mode_condition, mode_param = build_in_condition("c.mode", modes)
+        cursor.execute(
+            f"""
+            SELECT c.mode,
+                   COUNT(*),
+                   COUNT(DISTINCT c.creator_name),
+                   AVG(CASE WHEN c.heat > 0 THEN c.heat END),
+                   AVG(CASE WHEN c.level IS NOT NULL AND c.level != '' AND CAST(c.level AS REAL) > 0
+                            THEN CAST(c.level AS REAL) END),
+                   SUM(CASE WHEN c.status = 2 THEN 1 ELSE 0 END)
+            FROM charts c
+            WHERE {where_clause} AND {mode_condition}
+            GROUP BY c.mode
+            """,
+            params + [mode_param]
+        )
+        mode_stats = {row[0]: row[1:] for row in cursor.fetchall()}
+        
         comparison_data = []
         
         for mode in modes:
-            # 使用选择器构建谱面查询条件
-            where_clause, params = self.selector.build_chart_sql_where("c")
-            
-            # 覆盖模式筛选，使用当前循环的模式
-            if "c.mode IN" in where_clause or "c.mode =" in where_clause:
-                # 替换现有的模式条件
-                where_clause = re.sub(r'c\.mode IN \(.*?\)|c\.mode = \?', f'c.mode = ?', where_clause)
-                # 更新参数
-                params = [p for p in params if not isinstance(p, int) or p not in modes]
-                params.append(mode)
-            else:
-                where_clause += " AND c.mode = ?" if where_clause != "1=1" else "c.mode = ?"
-                params.append(mode)
-            
-            cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause}", params)
-            total_charts = cursor.fetchone()[0]
-            
-            cursor.execute(f"SELECT COUNT(DISTINCT c.creator_name) FROM charts c WHERE {where_clause} AND c.creator_name IS NOT NULL", params)
-            unique_creators = cursor.fetchone()[0]
-            
-            cursor.execute(f"SELECT AVG(c.heat) FROM charts c WHERE {where_clause} AND c.heat > 0", params)
-            avg_heat = cursor.fetchone()[0] or 0
-            
-            cursor.execute(f"SELECT AVG(CAST(c.level AS REAL)) FROM charts c WHERE {where_clause} AND c.level IS NOT NULL AND c.level != '' AND CAST(c.level AS REAL) > 0", params)
-            avg_level = cursor.fetchone()[0] or 0
-            
-            cursor.execute(f"SELECT COUNT(*) FROM charts c WHERE {where_clause} AND c.status = 2", params)
-            stable_charts = cursor.fetchone()[0]
+            total_charts, unique_creators, avg_heat, avg_level, stable_charts = mode_stats.get(mode, (0, 0, None, None, 0))
             
             mode_name = self.mode_names.get(mode, "未知")
             comparison_data.append({
@@ -4365,8 +4042,8 @@ class MalodyViz(cmd.Cmd):
                 'name': mode_name,
                 'total_charts': total_charts,
                 'unique_creators': unique_creators,
-                'avg_heat': avg_heat,
-                'avg_level': avg_level,
+                'avg_heat': avg_heat or 0,
+                'avg_level': avg_level or 0,
                 'stable_charts': stable_charts,
                 'stability_rate': (stable_charts / total_charts * 100) if total_charts > 0 else 0
             })
@@ -4388,50 +4065,6 @@ class MalodyViz(cmd.Cmd):
         if len(modes) > 1:
             self._generate_comparison_chart(comparison_data)
 
-    def _generate_comparison_chart(self, comparison_data):
-        """生成模式比较图表"""
-        modes = [f"{d['mode']}\n({d['name']})" for d in comparison_data]
-        total_charts = [d['total_charts'] for d in comparison_data]
-        unique_creators = [d['unique_creators'] for d in comparison_data]
-        
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
-        
-        # 左侧：总谱面数比较
-        bars1 = ax1.bar(modes, total_charts, color='lightblue', alpha=0.7)
-        ax1.set_title('各模式总谱面数比较\n筛选条件: ' + self.selector.get_current_selection())
-        ax1.set_ylabel('谱面数量')
-        ax1.tick_params(axis='x', rotation=45)
-        
-        # 添加数值标签
-        for bar in bars1:
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{int(height)}', ha='center', va='bottom')
-        
-        # 右侧：创作者数比较
-        bars2 = ax2.bar(modes, unique_creators, color='lightgreen', alpha=0.7)
-        ax2.set_title('各模式创作者数比较\n筛选条件: ' + self.selector.get_current_selection())
-        ax2.set_ylabel('创作者数量')
-        ax2.tick_params(axis='x', rotation=45)
-        
-        # 添加数值标签
-        for bar in bars2:
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{int(height)}', ha='center', va='bottom')
-        
-        plt.tight_layout()
-        
-        # 保存图表
-        base_filename = "stb_mode_comparison.png"
-        filename = self.get_unique_filename(base_filename, "png")
-        filepath = os.path.join(self.output_dir, filename)
-        plt.savefig(filepath, dpi=150, facecolor='white')
-        plt.close()
-        
-        print(colorize(f"\n已生成模式比较图表: {filepath}", Colors.GREEN))
-
-
     def _generate_comparison_chart(self, comparison_data):
         """生成模式比较图表"""
         modes = [f"{d['mode']}\n({d['name']})" for d in comparison_data]
@@ -4542,120 +4175,6 @@ class MalodyViz(cmd.Cmd):
             self.conn.rollback()
             print(colorize(f"\n数据库错误: {e}", Colors.RED))
     
-    @db_safe_operation
-    def do_stb_stabled(self, arg):
-        """
-        统计stable谱面的创作者排行榜（支持选择器筛选）
-        
-        用法: stb_stabled [模式] [数量]
-        参数:
-        模式 - 可选，模式编号，默认为当前模式
-        数量 - 可选，要显示的创作者数量，默认为20
-        
-        示例:
-        stb_stabled        # 当前模式stable谱面创作者排行榜
-        stb_stabled 0 10   # 模式0前10名stable谱面创作者
-        """
-        args = arg.split()
-        mode = self.current_mode
-        limit = 20
-        
-        if args:
-            try:
-                if int(args[0]) in self.mode_names:
-                    mode = int(args[0])
-                    if len(args) > 1:
-                        limit = int(args[1])
-                else:
-                    limit = int(args[0])
-                    if len(args) > 1 and int(args[1]) in self.mode_names:
-                        mode = int(args[1])
-            except ValueError:
-                print(colorize("错误: 请输入有效的数字", Colors.RED))
-                return
-        
-        if limit <= 0:
-            print(colorize("错误: 数量必须大于0", Colors.RED))
-            return
-        
-        cursor = self.conn.cursor()
-        
-        # 使用选择器构建谱面查询条件，并强制筛选状态为Stable(2)
-        where_clause, params = self.selector.build_chart_sql_where("c")
-        
-        # 确保只统计stable谱面
-        if "c.status IN" in where_clause or "c.status =" in where_clause:
-            # 如果已有状态筛选，确保包含stable状态
-            where_clause = re.sub(r'c\.status IN \(.*?\)|c\.status = \?', 'c.status = 2', where_clause)
-        else:
-            where_clause += " AND c.status = 2" if where_clause != "1=1" else "c.status = 2"
-        
-        # 如果选择器中没有指定模式，使用当前模式
-        if not self.selector.filters['modes'] and self.selector.current_mode != -1:
-            where_clause += " AND c.mode = ?" if where_clause != "1=1" else "c.mode = ?"
-            params.append(mode)
-        
-        query = f"""
-        SELECT c.creator_name, COUNT(*) as stable_count,
-            AVG(CAST(c.level AS REAL)) as avg_level,
-            AVG(c.heat) as avg_heat,
-            MAX(c.heat) as max_heat
-        FROM charts c
-        WHERE {where_clause} AND c.creator_name IS NOT NULL
-        GROUP BY c.creator_name
-        ORDER BY stable_count DESC, avg_heat DESC
-        LIMIT ?
-        """
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        
-        if not results:
-            print(colorize(f"\n没有找到符合条件的stable谱面", Colors.YELLOW))
-            return
-        
-        # 显示模式信息
-        if self.selector.filters['modes']:
-            mode_str = ", ".join([f"{m}({self.mode_names.get(m, '未知')})" for m in self.selector.filters['modes']])
-        elif self.selector.current_mode != -1:
-            mode_str = f"{self.selector.current_mode}({self.mode_names.get(self.selector.current_mode, '未知')})"
-        else:
-            mode_str = "所有模式"
-        
-        print(colorize(f"\nStable谱面创作者排行榜", Colors.CYAN))
-        print(colorize(f"模式: {mode_str}", Colors.YELLOW))
-        print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
-        print(get_separator())
-        
-        # 显示表头
-        header_format = "{:<4} {:<20} {:<8} {:<10} {:<10} {:<10}"
-        print(colorize(header_format.format(
-            "排名", "创作者", "Stable数", "平均难度", "平均热度", "最高热度"
-        ), Colors.BOLD))
-        print(get_separator())
-        
-        # 显示数据
-        for i, (creator, count, avg_level, avg_heat, max_heat) in enumerate(results, 1):
-            # 处理过长的创作者名
-            display_creator = creator if len(creator) <= 20 else creator[:17] + "..."
-            
-            print(header_format.format(
-                f"#{i}",
-                display_creator,
-                count,
-                f"{avg_level:.1f}" if avg_level else "N/A",
-                f"{avg_heat:.1f}" if avg_heat else "N/A",
-                f"{max_heat:.0f}" if max_heat else "N/A"
-            ))
-        
-        print(get_separator())
-        
-        # 生成图表的选项
-        chart_choice = input(colorize("\n是否生成图表? (y/N): ", Colors.CYAN)).lower()
-        if chart_choice == 'y':
-            self._generate_stabled_chart(results, mode_str)
-
     @db_safe_operation
     def do_stb_stabled(self, arg):
         """
@@ -4696,24 +4215,10 @@ class MalodyViz(cmd.Cmd):
         
         try:
             # 使用选择器构建谱面查询条件，并强制筛选状态为Stable(2)
-            # 先保存原始筛选条件
-            original_filters = self.selector.filters.copy()
-            
-            # 创建临时选择器，强制设置状态为2 (Stable)
-            temp_selector = MCSelector()
-            temp_selector.current_mode = self.selector.current_mode
-            temp_selector.set_filters(
-                players=self.selector.filters['players'],
-                difficulties=self.selector.filters['difficulties'],
-                time_range=self.selector.filters['time_range'],
-                modes=self.selector.filters['modes'],
-                statuses=[2]  # 强制只显示Stable谱面
-            )
-            
-            where_clause, params = temp_selector.build_chart_sql_where("c")
+            where_clause, params = self.selector.build_chart_sql_where("c", overrides={'statuses': [2]})
             
             # 如果选择器中没有指定模式，使用当前模式
-            if not temp_selector.filters['modes'] and temp_selector.current_mode != -1:
+            if not self.selector.filters['modes'] and self.selector.current_mode != -1:
                 where_clause += " AND c.mode = ?" if where_clause != "1=1" else "c.mode = ?"
                 params.append(mode)
             
@@ -4796,9 +4301,6 @@ class MalodyViz(cmd.Cmd):
             print(colorize(f"参数: {params}", Colors.YELLOW))
         except Exception as e:
             print(colorize(f"操作错误: {e}", Colors.RED))
-        finally:
-            # 恢复原始筛选条件
-            self.selector.set_filters(**original_filters)
 
     @db_safe_operation
     def do_export(self, arg):
@@ -4845,21 +4347,7 @@ class MalodyViz(cmd.Cmd):
             where_clause, params = self.selector.build_player_sql_where("pr")
             
             # 获取最新爬取时间
-            if self.selector.filters['modes']:
-                mode_condition = "pr.mode IN ({})".format(','.join(['?']*len(self.selector.filters['modes'])))
-                cursor.execute(
-                    f"SELECT MAX(crawl_time) FROM player_rankings pr WHERE {mode_condition}",
-                    self.selector.filters['modes']
-                )
-            elif self.selector.current_mode != -1:
-                cursor.execute(
-                    "SELECT MAX(crawl_time) FROM player_rankings WHERE mode = ?",
-                    (self.selector.current_mode,)
-                )
-            else:
-                cursor.execute("SELECT MAX(crawl_time) FROM player_rankings")
-            
-            latest_time = cursor.fetchone()[0]
+            latest_time = self._get_latest_crawl_time(cursor)
             
             if not latest_time:
                 print(colorize("没有找到数据", Colors.YELLOW))
@@ -4879,19 +4367,20 @@ class MalodyViz(cmd.Cmd):
             """
             
             cursor.execute(query, params)
-            players = cursor.fetchall()
+            first_rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
             
-            if not players:
+            if not first_rows:
                 print(colorize("没有找到符合条件的玩家", Colors.YELLOW))
                 return 
             
-            df = pd.DataFrame(players, columns=['模式', '排名', '玩家名', '等级', '经验', '准确率', '连击', '游玩次数'])
-            
             # 使用唯一文件名避免覆盖
             base_filename = f"top_players.csv"
             filename = self.get_unique_filename(base_filename, "csv")
             filepath = os.path.join(self.output_dir, filename)
-            df.to_csv(filepath, index=False, encoding='utf-8-sig')
+            self._export_rows_to_csv(
+                cursor, filepath, first_rows,
+                ['模式', '排名', '玩家名', '等级', '经验', '准确率', '连击', '游玩次数']
+            )
             
             print(colorize(f"\n已导出顶级玩家数据: {filepath}", Colors.GREEN))
             print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
@@ -4915,19 +4404,17 @@ class MalodyViz(cmd.Cmd):
             """
             
             cursor.execute(query, params)
-            history_data = cursor.fetchall()
+            first_rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
             
-            if not history_data:
+            if not first_rows:
                 print(colorize(f"\n没有找到数据", Colors.YELLOW))
                 return
             
-            df = pd.DataFrame(history_data, columns=['玩家名', '排名', '时间', '模式'])
-            
             # 使用唯一文件名避免覆盖
             base_filename = f"history_data.csv"
             filename = self.get_unique_filename(base_filename, "csv")
             filepath = os.path.join(self.output_dir, filename)
-            df.to_csv(filepath, index=False, encoding='utf-8-sig')
+            self._export_rows_to_csv(cursor, filepath, first_rows, ['玩家名', '排名', '时间', '模式'])
             
             print(colorize(f"\n已导出历史数据: {filepath}", Colors.GREEN))
             print(colorize(f"筛选条件: {self.selector.get_current_selection()}", Colors.YELLOW))
@@ -4935,6 +4422,20 @@ class MalodyViz(cmd.Cmd):
         else:
             print(colorize("错误: 请指定有效的导出类型: top 或 history", Colors.RED))
     
+    def _export_rows_to_csv(self, cursor, filepath, first_rows, header):
+        """边读边写导出查询结果
+        
+        历史数据可能有数十万行，按批fetchmany写入文件，
+        内存占用与导出行数无关，也不再经过DataFrame复制一遍
+        """
+        with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(header)
+            rows = first_rows
+            while rows:
+                writer.writerows(rows)
+                rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+    
     def do_update(self, arg):
         """
         更新数据（调用爬虫脚本）
@@ -5007,11 +4508,6 @@ class MalodyViz(cmd.Cmd):
             self.stdout.write("\n")
 
 if __name__ == "__main__":
-    if not os.path.exists("malody_rankings.db"):
-        print(colorize("错误: 未找到数据库文件 'malody_rankings.db'", Colors.RED))
-        print(colorize("请确保数据库文件与脚本在同一目录下", Colors.YELLOW))
-        sys.exit(1)
-    
     try:
         MalodyViz().cmdloop()
     except KeyboardInterrupt:
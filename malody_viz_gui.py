@@ -22,7 +22,7 @@ from functools import wraps
 import subprocess
 
 # 导入原脚本的功能
-from malody_stats import MalodyViz, Colors, colorize, db_safe_operation
+from malody_stats import MalodyViz, Colors, colorize, db_safe_operation, history_columns, history_line_fmt, m4_downsample_indices
 
 class MalodyGUI:
     """Malody数据可视化GUI界面"""
@@ -247,11 +247,13 @@ class MalodyGUI:
     
     def _process_messages(self):
         """处理消息队列"""
+        # 同一轮中的多条状态消息只保留最后一条，最后统一刷新一次状态栏
+        latest_status = None
         try:
             while True:
                 message = self.message_queue.get_nowait()
                 if message.startswith("STATUS:"):
-                    self._update_status(message[7:])
+                    latest_status = message[7:]
                 elif message.startswith("MESSAGE:"):
                     parts = message[8:].split("|", 1)
                     if len(parts) == 2:
@@ -263,6 +265,8 @@ class MalodyGUI:
         except queue.Empty:
             pass
         finally:
+            if latest_status is not None:
+                self._update_status(latest_status)
             self.root.after(100, self._process_messages)
     
     def _thread_safe_draw_figure(self, fig):
@@ -316,13 +320,15 @@ class MalodyGUI:
                     # 设置刻度颜色
                     ax_dest.tick_params(colors='black')
                     
-                    # 处理日期格式
-                    if len(xdata) > 0 and isinstance(xdata[0], (datetime, np.datetime64)):
+                    # 处理日期格式（历史图表的x轴是预先转换好的日期数值，按源坐标轴的格式化器判断）
+                    if isinstance(ax_src.xaxis.get_major_formatter(), mdates.DateFormatter):
+                        ax_dest.xaxis_date()
                         ax_dest.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
                         ax_dest.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1))
                         self.figure.autofmt_xdate()
-                
-                self.canvas.draw()
+
+                # 使用draw_idle合并短时间内的多次重绘请求，避免渲染被立即覆盖的中间帧
+                self.canvas.draw_idle()
                 self._update_status("图表生成完成")
                 
             except Exception as e:
@@ -406,17 +412,21 @@ class MalodyGUI:
             (player_id, mode, start_date)
         )
         
-        history_data = cursor.fetchall()
+        # 直接从游标读取为列式numpy数组，后续降采样和绘图都直接基于数组操作
+        ranks, dates = history_columns(cursor)
         
-        if not history_data:
+        if len(ranks) == 0:
             mode_name = self.viz.mode_names.get(mode, "未知")
             return None, f"玩家 {player_name} 在模式 {mode} ({mode_name}) 中最近 {days} 天没有数据"
         
-        dates = [row[1] for row in history_data]
-        ranks = [row[0] for row in history_data]
-        
         fig, ax = plt.subplots(figsize=(12, 6))
-        ax.plot(dates, ranks, 'o-', linewidth=2, markersize=4)
+        
+        # 数据点远多于图表像素时先做M4降采样
+        keep = m4_downsample_indices(dates, ranks, int(fig.get_figwidth() * fig.dpi))
+        if len(keep) < len(dates):
+            dates, ranks = dates[keep], ranks[keep]
+        
+        ax.plot(dates, ranks, history_line_fmt(len(dates)), linewidth=2, markersize=4)
         ax.invert_yaxis()
         mode_name = self.viz.mode_names.get(mode, "未知")
         
@@ -427,6 +437,7 @@ class MalodyGUI:
         ax.grid(True, alpha=0.3)
         ax.tick_params(colors='black')
         
+        ax.xaxis_date()  # x轴数据已是matplotlib日期数值
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
         ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1))
         fig.autofmt_xdate()
@@ -498,15 +509,18 @@ class MalodyGUI:
                 (player_id, mode, start_date)
             )
             
-            history_data = cursor.fetchall()
+            # 直接从游标读取为列式numpy数组，后续降采样和绘图都直接基于数组操作
+            ranks, dates = history_columns(cursor)
             
-            if not history_data:
+            if len(ranks) == 0:
                 continue
             
-            dates = [row[1] for row in history_data]
-            ranks = [row[0] for row in history_data]
+            # 数据点远多于图表像素时先做M4降采样
+            keep = m4_downsample_indices(dates, ranks, int(fig.get_figwidth() * fig.dpi))
+            if len(keep) < len(dates):
+                dates, ranks = dates[keep], ranks[keep]
             
-            ax.plot(dates, ranks, 'o-', linewidth=2, markersize=4, 
+            ax.plot(dates, ranks, history_line_fmt(len(dates)), linewidth=2, markersize=4, 
                    color=colors[idx], label=player_name)
             found_any = True
         
@@ -524,6 +538,7 @@ class MalodyGUI:
         ax.legend()
         ax.tick_params(colors='black')
         
+        ax.xaxis_date()  # x轴数据已是matplotlib日期数值
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
         ax.xaxis.set_major_locator(mdates.WeekdayLocator(interval=1))
         fig.autofmt_xdate()
@@ -579,17 +594,14 @@ class MalodyGUI:
         """绘制顶级玩家分布图表 - 复用命令行版本代码"""
         cursor = self.viz.conn.cursor()
         
-        cursor.execute(
-            "SELECT MAX(crawl_time) FROM player_rankings WHERE mode = ?",
-            (mode,)
-        )
-        latest_time = cursor.fetchone()[0]
+        latest_time = self.viz._get_latest_crawl_time(cursor, [mode])
         
         if not latest_time:
             mode_name = self.viz.mode_names.get(mode, "未知")
             return None, f"模式 {mode} ({mode_name}) 没有数据"
         
-        cursor.execute(
+        players = self.viz._fetch_snapshot(
+            cursor,
             """
             SELECT pr.rank, pr.name, pr.acc, pr.exp
             FROM player_rankings pr
@@ -600,16 +612,12 @@ class MalodyGUI:
             (mode, latest_time, limit)
         )
         
-        players = cursor.fetchall()
-        
         if not players:
             mode_name = self.viz.mode_names.get(mode, "未知")
             return None, f"模式 {mode} ({mode_name}) 没有找到玩家数据"
         
-        ranks = [p[0] for p in players]
-        names = [p[1] for p in players]
-        accuracies = [p[2] for p in players]
-        exps = [p[3] for p in players]
+        # 一次转置得到各列，代替对每行按下标逐列取值
+        ranks, names, accuracies, exps = map(list, zip(*players))
         
         # 创建更大的图表以适应更多玩家名
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 12))
@@ -655,12 +663,15 @@ class MalodyGUI:
                     f'{exp:.0f}', ha='center', va='bottom', fontsize=8,
                     bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.7))
         
-        # 添加玩家名字
+        # 添加玩家名字（标签位置只依赖整体最值，循环外一次性计算）
+        name_y_acc = -0.08 * np.max(acc_diffs)
+        min_exp = np.min(exps)
+        name_y_exp = 0.1 * min_exp if min_exp > 0 else 1
         for i, name in enumerate(names):
             display_name = name if len(name) <= 12 else name[:10] + '...'
-            ax1.text(i, -0.08 * max(acc_diffs), display_name, 
+            ax1.text(i, name_y_acc, display_name, 
                     ha='right', va='top', rotation=60, fontsize=7, color='black')
-            ax2.text(i, 0.1 * min(exps) if min(exps) > 0 else 1, display_name,
+            ax2.text(i, name_y_exp, display_name,
                     ha='right', va='bottom', rotation=60, fontsize=7, color='black')
         
         plt.tight_layout()
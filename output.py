@@ -2,7 +2,6 @@ import sqlite3
 import pandas as pd
 import logging
 from datetime import datetime
-import os
 
 def export_all_key_stable_data():
     """导出Key模式下所有Stable谱面的完整数据"""
@@ -15,14 +14,13 @@ def export_all_key_stable_data():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
     
-    # 检查数据库文件
-    if not os.path.exists(db_path):
-        logger.error(f"数据库文件不存在: {db_path}")
-        return False
-    
     try:
-        # 连接数据库
-        conn = sqlite3.connect(db_path)
+        # 连接数据库（rw模式下文件不存在会直接报错，不会静默创建空库）
+        try:
+            conn = sqlite3.connect(f"file:{db_path}?mode=rw", uri=True)
+        except sqlite3.OperationalError as e:
+            logger.error(f"无法打开数据库文件: {db_path} ({e})")
+            return False
         logger.info("数据库连接成功")
         
         # 查询所有Key模式Stable谱面的完整数据
@@ -1,7 +1,41 @@
 # selector.py
 import re
+import json
 from typing import List, Dict, Any, Union, Optional, Tuple
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+
+# 模式名称，按模式编号索引（模块级常量，避免每次调用重新构建字典）
+MODE_NAMES = ("Key", "Step", "DJ", "Catch", "Pad", "Taiko", "Ring", "Slide", "Live", "Cube")
+
+def get_mode_name(mode: int) -> str:
+    """根据模式编号获取模式名称"""
+    return MODE_NAMES[mode] if 0 <= mode < len(MODE_NAMES) else "未知"
+
+def build_in_condition(column: str, values) -> Tuple[str, Any]:
+    """构建 column IN (...) 条件
+    
+    只有一个值时生成 column = ?：等值条件可沿 (column, ...) 复合索引有序扫描，
+    例如按 (mode, crawl_time) 倒序取最新一条后立即停止，json_each子查询会丢掉这一顺序；
+    多个值时列表整体作为一个JSON参数经json_each展开，SQL文本与列表长度无关，
+    不同数量的模式/状态共用同一条预编译语句缓存
+    """
+    values = list(values)
+    if len(values) == 1:
+        return f"{column} = ?", values[0]
+    return f"{column} IN (SELECT value FROM json_each(?))", json.dumps(values)
+
+# 选择器语法与相对时间的正则，模块加载时编译一次
+_SELECTOR_PATTERN = re.compile(r'@([pdtsm*])\[([^\]]*)\]|@(\*)')
+_RELATIVE_TIME_PATTERN = re.compile(r'^([+-]?\d+)([dhwm])$')
+
+# 相对时间单位：天、小时、周、自然月
+_TIME_UNITS = {
+    'd': timedelta(days=1),
+    'h': timedelta(hours=1),
+    'w': timedelta(weeks=1),
+    'm': relativedelta(months=1),
+}
 
 class MCSelector:
     """类似MC的选择器，支持玩家、谱师、难度、时间范围、模式、状态等筛选"""
@@ -39,9 +73,8 @@ class MCSelector:
             return {}
             
         result = {}
-        pattern = r'@([pdtsm*])\[([^\]]*)\]|@(\*)'
         
-        matches = re.findall(pattern, selector_str)
+        matches = _SELECTOR_PATTERN.findall(selector_str)
         for match in matches:
             selector_type = match[0] or match[2]
             condition = match[1]
@@ -76,31 +109,37 @@ class MCSelector:
             return []
     
     def _parse_time_range(self, condition: str) -> Dict[str, datetime]:
-        """解析时间范围"""
+        """解析时间范围
+        
+        相对时间和具体日期都表示"从start至今"，不设上界，
+        生成的SQL只有 >= start，可沿时间索引做范围扫描，也不会漏掉解析之后新爬取的数据
+        """
         now = datetime.now()
         
         if not condition:
-            return {'start': now - timedelta(days=30), 'end': now}
+            return {'start': now - timedelta(days=30)}
             
         try:
-            if condition.endswith('d'):  # 天数
-                days = int(condition[:-1])
-                return {'start': now - timedelta(days=days), 'end': now}
-            elif condition.endswith('h'):  # 小时
-                hours = int(condition[:-1])
-                return {'start': now - timedelta(hours=hours), 'end': now}
-            elif condition.endswith('w'):  # 周数
-                weeks = int(condition[:-1])
-                return {'start': now - timedelta(weeks=weeks), 'end': now}
-            elif condition.endswith('m'):  # 月数
-                months = int(condition[:-1])
-                return {'start': now - timedelta(days=months*30), 'end': now}
-            else:
-                # 尝试解析为具体日期
-                target_date = datetime.strptime(condition, '%Y-%m-%d')
-                return {'start': target_date, 'end': now}
+            # 相对时间：7d(天) / 12h(小时) / 2w(周) / 3m(月)
+            match = _RELATIVE_TIME_PATTERN.match(condition.strip())
+            if match:
+                amount, unit = match.groups()
+                return {'start': now - int(amount) * _TIME_UNITS[unit]}
+            
+            # 尝试解析为具体日期
+            target_date = datetime.strptime(condition, '%Y-%m-%d')
+            return {'start': target_date}
         except (ValueError, TypeError):
-            return {'start': now - timedelta(days=30), 'end': now}
+            return {'start': now - timedelta(days=30)}
+    
+    def build_time_condition(self, column: str, time_range: Optional[Dict[str, datetime]] = None) -> tuple:
+        """构建时间范围的SQL条件和参数，只有下界 column >= start"""
+        if time_range is None:
+            time_range = self.filters['time_range']
+        if not time_range:
+            return None, []
+        
+        return f"{column} >= ?", [time_range['start']]
     
     def build_player_sql_where(self, base_table: str = "pr") -> tuple:
         """构建玩家相关的SQL WHERE条件和参数"""
@@ -121,16 +160,15 @@ class MCSelector:
         
         # 时间范围筛选
         if self.filters['time_range']:
-            conditions.append(f"{base_table}.crawl_time BETWEEN ? AND ?")
-            params.extend([
-                self.filters['time_range']['start'],
-                self.filters['time_range']['end']
-            ])
+            time_condition, time_params = self.build_time_condition(f"{base_table}.crawl_time")
+            conditions.append(time_condition)
+            params.extend(time_params)
         
         # 模式筛选
         if self.filters['modes']:
-            conditions.append(f"{base_table}.mode IN ({','.join(['?']*len(self.filters['modes']))})")
-            params.extend(self.filters['modes'])
+            mode_condition, mode_param = build_in_condition(f"{base_table}.mode", self.filters['modes'])
+            conditions.append(mode_condition)
+            params.append(mode_param)
         elif self.current_mode != -1:  # 当前单个模式
             conditions.append(f"{base_table}.mode = ?")
             params.append(self.current_mode)
@@ -140,49 +178,55 @@ class MCSelector:
         where_clause = " AND ".join(conditions) if conditions else "1=1"
         return where_clause, params
     
-    def build_chart_sql_where(self, base_table: str = "c") -> tuple:
-        """构建谱面相关的SQL WHERE条件和参数"""
+    def build_chart_sql_where(self, base_table: str = "c", overrides: Optional[Dict[str, Any]] = None,
+                              use_current_mode: bool = True) -> tuple:
+        """构建谱面相关的SQL WHERE条件和参数
+        
+        overrides 可临时覆盖部分筛选条件（如强制状态），不修改选择器本身；
+        use_current_mode 为False时，未指定模式筛选也不回退到当前模式（由调用方自行限定模式）
+        """
+        filters = {**self.filters, **overrides} if overrides else self.filters
         conditions = []
         params = []
         
         # 谱师筛选（复用玩家筛选条件，应用到creator_name字段）
-        if self.filters['players']:
+        if filters['players']:
             creator_conditions = []
-            for creator in self.filters['players']:
+            for creator in filters['players']:
                 # 对于谱面，我们只支持名称匹配（creator_name字段）
                 creator_conditions.append(f"{base_table}.creator_name LIKE ?")
                 params.append(f"%{creator}%")
             conditions.append(f"({' OR '.join(creator_conditions)})")
         
         # 难度筛选
-        if self.filters['difficulties']:
-            if len(self.filters['difficulties']) == 1:
+        if filters['difficulties']:
+            if len(filters['difficulties']) == 1:
                 conditions.append(f"{base_table}.level = ?")
-                params.append(str(self.filters['difficulties'][0]))
-            elif len(self.filters['difficulties']) == 2:
+                params.append(str(filters['difficulties'][0]))
+            elif len(filters['difficulties']) == 2:
                 conditions.append(f"CAST({base_table}.level AS REAL) BETWEEN ? AND ?")
-                params.extend(self.filters['difficulties'])
+                params.extend(filters['difficulties'])
         
         # 时间范围筛选
-        if self.filters['time_range']:
-            conditions.append(f"{base_table}.last_updated BETWEEN ? AND ?")
-            params.extend([
-                self.filters['time_range']['start'],
-                self.filters['time_range']['end']
-            ])
+        if filters['time_range']:
+            time_condition, time_params = self.build_time_condition(f"{base_table}.last_updated", filters['time_range'])
+            conditions.append(time_condition)
+            params.extend(time_params)
         
         # 模式筛选
-        if self.filters['modes']:
-            conditions.append(f"{base_table}.mode IN ({','.join(['?']*len(self.filters['modes']))})")
-            params.extend(self.filters['modes'])
-        elif self.current_mode != -1:  # 当前单个模式
+        if filters['modes']:
+            mode_condition, mode_param = build_in_condition(f"{base_table}.mode", filters['modes'])
+            conditions.append(mode_condition)
+            params.append(mode_param)
+        elif use_current_mode and self.current_mode != -1:  # 当前单个模式
             conditions.append(f"{base_table}.mode = ?")
             params.append(self.current_mode)
         
         # 状态筛选
-        if self.filters['statuses']:
-            conditions.append(f"{base_table}.status IN ({','.join(['?']*len(self.filters['statuses']))})")
-            params.extend(self.filters['statuses'])
+        if filters['statuses']:
+            status_condition, status_param = build_in_condition(f"{base_table}.status", filters['statuses'])
+            conditions.append(status_condition)
+            params.append(status_param)
         
         where_clause = " AND ".join(conditions) if conditions else "1=1"
         return where_clause, params
@@ -219,18 +263,14 @@ class MCSelector:
                 parts.append(f"难度: {self.filters['difficulties'][0]}-{self.filters['difficulties'][1]}")
         
         if self.filters['time_range']:
-            days = (self.filters['time_range']['end'] - self.filters['time_range']['start']).days
+            days = (datetime.now() - self.filters['time_range']['start']).days
             parts.append(f"时间: 最近{days}天")
         
         if self.filters['modes']:
-            mode_names = {0: "Key", 1: "Step", 2: "DJ", 3: "Catch", 4: "Pad", 
-                         5: "Taiko", 6: "Ring", 7: "Slide", 8: "Live", 9: "Cube"}
-            mode_str = ', '.join([f"{m}({mode_names.get(m, '未知')})" for m in self.filters['modes']])
+            mode_str = ', '.join([f"{m}({get_mode_name(m)})" for m in self.filters['modes']])
             parts.append(f"模式: {mode_str}")
         elif self.current_mode != -1:
-            mode_names = {0: "Key", 1: "Step", 2: "DJ", 3: "Catch", 4: "Pad", 
-                         5: "Taiko", 6: "Ring", 7: "Slide", 8: "Live", 9: "Cube"}
-            parts.append(f"模式: {self.current_mode}({mode_names.get(self.current_mode, '未知')})")
+            parts.append(f"模式: {self.current_mode}({get_mode_name(self.current_mode)})")
         else:
             parts.append("模式: 所有")
         
@@ -0,0 +1,21 @@
+"""SQLite datetime 适配器/转换器，爬虫与查看器共用"""
+import sqlite3
+from datetime import datetime
+
+try:
+    # 可选依赖：ciso8601为C实现的ISO 8601解析器，比fromisoformat更快
+    from ciso8601 import parse_datetime as _parse_iso_datetime
+except ImportError:
+    _parse_iso_datetime = datetime.fromisoformat
+
+# 修复Python 3.12中SQLite datetime适配器的弃用警告
+def adapt_datetime(dt):
+    return dt.isoformat()
+
+def convert_datetime(s):
+    return _parse_iso_datetime(s.decode())
+
+def register_datetime_converters():
+    """注册datetime适配器及timestamp列的转换器（对全局sqlite3模块生效，重复调用无副作用）"""
+    sqlite3.register_adapter(datetime, adapt_datetime)
+    sqlite3.register_converter("timestamp", convert_datetime)
@@ -106,6 +106,27 @@ MODE_MAP = {
     9: "Cube"
 }
 
+# 页面解析用的正则，模块加载时编译一次，逐个谱面解析时直接复用
+_MALODY_SCRIPT_RE = re.compile(r'window\.malody')
+_SCRIPT_SID_RE = re.compile(r'sid\s*:\s*(\d+)')
+_SCRIPT_CID_RE = re.compile(r'cid:(\d+)')
+_CID_SCRIPT_MARK_RE = re.compile('cid')
+_SCRIPT_CIDS_RE = re.compile(r'cid[\'"]?\s*:\s*[\'"]?(\d+)')
+_CSS_URL_RE = re.compile(r'url\((.*?)\)')
+_COVER_SID_RE = re.compile(r'/(\d+)!')
+_SONG_LINK_RE = re.compile(r'/song/(\d+)')
+_CHART_LINK_RE = re.compile(r'/chart/(\d+)')
+_USER_LINK_RE = re.compile(r'/accounts/user/(\d+)')
+_SONG_ID_TEXT_RE = re.compile(r'[Ss]ong[ _-]?[IiDd]')
+_DIGITS_RE = re.compile(r'(\d+)')
+_STATUS_CLASS_RE = re.compile(r't[12]')
+_MODE_ICON_RE = re.compile(r'mode-(\d+)')
+_LEVEL_RE = re.compile(r'Lv\.(\d+(?:\.\d+)?)')
+_CHART_ID_RE = re.compile(r'ID\s*:c?(\d+)')
+_LENGTH_RE = re.compile(r'Length\s*:\s*(\d+)s')
+_BPM_RE = re.compile(r'BPM\s*:\s*(\d+(?:\.\d+)?)')
+_LAST_UPDATED_RE = re.compile(r'Last updated\s*:\s*(\d{4}-\d{2}-\d{2} \d{2}:\d{2})')
+
 class STBCrawler:
     def __init__(self, session=None):
         # 首先设置日志
@@ -237,6 +258,10 @@ class STBCrawler:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_charts_mode ON charts(mode)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_charts_status ON charts(status)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_charts_last_updated ON charts(last_updated)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_charts_mode_last_updated ON charts(mode, last_updated)')
+        # 热门谱面按热度倒序取前N条，索引有序扫描后只需按songs主键回查标题/艺术家
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_charts_heat ON charts(heat DESC)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_charts_mode_heat ON charts(mode, heat DESC)')
         
         # 检查并添加缺失的列
         self._check_and_add_missing_columns()
@@ -406,10 +431,10 @@ class STBCrawler:
         
         try:
             # 方法1: 从JavaScript变量中提取SID
-            script_text = soup.find('script', string=re.compile('window\.malody'))
+            script_text = soup.find('script', string=_MALODY_SCRIPT_RE)
             if script_text:
                 # 查找sid
-                sid_match = re.search(r'sid\s*:\s*(\d+)', script_text.string)
+                sid_match = _SCRIPT_SID_RE.search(script_text.string)
                 if sid_match:
                     song_data["sid"] = int(sid_match.group(1))
                     self.logger.debug("从JS提取到SID: %s", song_data["sid"])
@@ -419,12 +444,12 @@ class STBCrawler:
                 cover_div = soup.select_one('.song_title .cover')
                 if cover_div and 'style' in cover_div.attrs:
                     style = cover_div['style']
-                    url_match = re.search(r'url\((.*?)\)', style)
+                    url_match = _CSS_URL_RE.search(style)
                     if url_match:
                         cover_url = url_match.group(1)
                         song_data["cover_url"] = cover_url
                         # 从封面URL提取SID
-                        sid_match = re.search(r'/(\d+)!', cover_url)
+                        sid_match = _COVER_SID_RE.search(cover_url)
                         if sid_match:
                             song_data["sid"] = int(sid_match.group(1))
                             self.logger.debug("从封面URL提取SID: %s", song_data["sid"])
@@ -434,7 +459,7 @@ class STBCrawler:
                 for link in soup.find_all('a', href=True):
                     href = link['href']
                     if '/song/' in href:
-                        sid_match = re.search(r'/song/(\d+)', href)
+                        sid_match = _SONG_LINK_RE.search(href)
                         if sid_match:
                             song_data["sid"] = int(sid_match.group(1))
                             self.logger.debug("从链接提取SID: %s", song_data["sid"])
@@ -443,9 +468,9 @@ class STBCrawler:
             # 方法4: 从面包屑导航或其他元素中提取
             if not song_data["sid"]:
                 # 查找包含歌曲ID的元素
-                sid_elements = soup.find_all(text=re.compile(r'[Ss]ong[ _-]?[IiDd]'))
+                sid_elements = soup.find_all(text=_SONG_ID_TEXT_RE)
                 for element in sid_elements:
-                    sid_match = re.search(r'(\d+)', element)
+                    sid_match = _DIGITS_RE.search(element)
                     if sid_match:
                         song_data["sid"] = int(sid_match.group(1))
                         self.logger.debug("从文本提取SID: %s", song_data["sid"])
@@ -466,7 +491,7 @@ class STBCrawler:
             
             # 从JavaScript变量中提取cid
             if script_text:
-                cid_match = re.search(r'cid:(\d+)', script_text.string)
+                cid_match = _SCRIPT_CID_RE.search(script_text.string)
                 if cid_match:
                     chart_data["cid"] = int(cid_match.group(1))
                     self.logger.debug("从JS提取到CID: %s", chart_data["cid"])
@@ -491,7 +516,7 @@ class STBCrawler:
             else:
                 self.logger.debug("未找到状态标签")
                 # 尝试从其他位置查找状态信息
-                status_elements = soup.find_all('em', class_=re.compile(r't[12]'))
+                status_elements = soup.find_all('em', class_=_STATUS_CLASS_RE)
                 for elem in status_elements:
                     status_text = elem.get_text().strip()
                     if status_text in STATUS_MAP:
@@ -536,7 +561,7 @@ class STBCrawler:
                 img_tag = mode_tag.find('img')
                 if img_tag and 'src' in img_tag.attrs:
                     src = img_tag['src']
-                    mode_match = re.search(r'mode-(\d+)', src)
+                    mode_match = _MODE_ICON_RE.search(src)
                     if mode_match:
                         chart_data["mode"] = int(mode_match.group(1))
                         self.logger.debug("提取模式: %s", chart_data["mode"])
@@ -545,7 +570,7 @@ class STBCrawler:
                 
                 # 提取等级
                 version_text = chart_data["version"]
-                level_match = re.search(r'Lv\.(\d+(?:\.\d+)?)', version_text)
+                level_match = _LEVEL_RE.search(version_text)
                 if level_match:
                     chart_data["level"] = level_match.group(1)
                     self.logger.debug("提取等级: %s", chart_data["level"])
@@ -567,7 +592,7 @@ class STBCrawler:
                 
                 if creator_link and 'href' in creator_link.attrs:
                     href = creator_link['href']
-                    uid_match = re.search(r'/accounts/user/(\d+)', href)
+                    uid_match = _USER_LINK_RE.search(href)
                     if uid_match:
                         chart_data["creator_uid"] = int(uid_match.group(1))
                         chart_data["creator_name"] = creator_link.get_text().strip()
@@ -591,7 +616,7 @@ class STBCrawler:
                 
                 if stabled_link and 'href' in stabled_link.attrs:
                     href = stabled_link['href']
-                    uid_match = re.search(r'/accounts/user/(\d+)', href)
+                    uid_match = _USER_LINK_RE.search(href)
                     if uid_match:
                         chart_data["stabled_by_uid"] = int(uid_match.group(1))
                         chart_data["stabled_by_name"] = stabled_link.get_text().strip()
@@ -607,13 +632,13 @@ class STBCrawler:
                 
                 # 使用正则表达式提取所有信息
                 # ID
-                id_match = re.search(r'ID\s*:c?(\d+)', sub_text)
+                id_match = _CHART_ID_RE.search(sub_text)
                 if id_match:
                     chart_data["cid"] = int(id_match.group(1))
                     self.logger.debug("提取CID: %s", chart_data["cid"])
                 
                 # 长度 - 修复：使用英文"Length"而不是中文"长度"
-                length_match = re.search(r'Length\s*:\s*(\d+)s', sub_text)
+                length_match = _LENGTH_RE.search(sub_text)
                 if length_match:
                     length_value = int(length_match.group(1))
                     chart_data["chart_length"] = length_value
@@ -621,7 +646,7 @@ class STBCrawler:
                     self.logger.debug("提取长度: %s秒", length_value)
                 
                 # BPM
-                bpm_match = re.search(r'BPM\s*:\s*(\d+(?:\.\d+)?)', sub_text)
+                bpm_match = _BPM_RE.search(sub_text)
                 if bpm_match:
                     try:
                         song_data["bpm"] = float(bpm_match.group(1))
@@ -630,7 +655,7 @@ class STBCrawler:
                         self.logger.warning("无法解析BPM值: %s", bpm_match.group(1))
                 
                 # 最后更新时间 - 修复：使用英文"Last updated"而不是中文"最后更新"
-                date_match = re.search(r'Last updated\s*:\s*(\d{4}-\d{2}-\d{2} \d{2}:\d{2})', sub_text)
+                date_match = _LAST_UPDATED_RE.search(sub_text)
                 if date_match:
                     try:
                         chart_data["last_updated"] = datetime.strptime(date_match.group(1), "%Y-%m-%d %H:%M")
@@ -979,7 +1004,7 @@ class STBCrawler:
                     continue
                 
                 # 提取歌曲ID
-                sid_match = re.search(r'/song/(\d+)', song_url)
+                sid_match = _SONG_LINK_RE.search(song_url)
                 if not sid_match:
                     self.logger.debug("卡片 %d 无法提取歌曲ID: %s", i+1, song_url)
                     continue
@@ -1043,8 +1068,7 @@ class STBCrawler:
             response.raise_for_status()
             
             # 方法1: 正则匹配所有chart链接
-            pattern = r'/chart/(\d+)'
-            matches = re.findall(pattern, response.text)
+            matches = _CHART_LINK_RE.findall(response.text)
             for match in matches:
                 cids.add(int(match))
             
@@ -1055,14 +1079,14 @@ class STBCrawler:
             for link in soup.find_all('a', href=True):
                 href = link['href']
                 if '/chart/' in href:
-                    cid_match = re.search(r'/chart/(\d+)', href)
+                    cid_match = _CHART_LINK_RE.search(href)
                     if cid_match:
                         cids.add(int(cid_match.group(1)))
             
             # 方法3: 从JavaScript数据中提取
-            script_text = soup.find('script', string=re.compile('cid'))
+            script_text = soup.find('script', string=_CID_SCRIPT_MARK_RE)
             if script_text:
-                cid_matches = re.findall(r'cid[\'"]?\s*:\s*[\'"]?(\d+)', script_text.string)
+                cid_matches = _SCRIPT_CIDS_RE.findall(script_text.string)
                 for match in cid_matches:
                     cids.add(int(match))
             
@@ -1101,7 +1125,7 @@ class STBCrawler:
             # 从链接中提取CID
             cids = set()
             for link in chart_links:
-                cid_match = re.search(r'/chart/(\d+)', link)
+                cid_match = _CHART_LINK_RE.search(link)
                 if cid_match:
                     cid = int(cid_match.group(1))
                     cids.add(cid)